@@ -1,34 +1,156 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import DeclarativeBase
-from typing import AsyncGenerator
+from fastapi import Request, Response
+from typing import AsyncGenerator, Callable, Optional, Sequence
+import itertools
+import math
 import os
+import time
 
 # Default to SQLite if no DATABASE_URL is set
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./sql_app.db")
 
-# SQLite-specific arguments
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# Optional read replicas for GET routes, comma separated
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URL", "").split(",") if url.strip()]
+# How long a client keeps reading from the primary after its own write
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# How long a failed replica is skipped before it is tried again
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Set on a client's own writes: the Unix time until which its reads go to the primary
+STICKY_COOKIE = "read_primary_until"
+
+def make_engine(url: str) -> AsyncEngine:
+    # SQLite-specific arguments
+    connect_args = {}
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+    return create_async_engine(url, connect_args=connect_args)
+
+def make_sessionmaker(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
 
 # Create AsyncEngine
-engine = create_async_engine(
-    DATABASE_URL,
-    connect_args=connect_args,
-)
+engine = make_engine(DATABASE_URL)
 
 # Request-scoped session factory
-SessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False,
-)
+SessionLocal = make_sessionmaker(engine)
 
 class Base(DeclarativeBase):
     pass
 
+class ReadRouter:
+    """Chooses where a read-only request runs: a replica, or the primary.
+
+    Replicas are used round-robin, skipping any that failed in the last
+    `retry_seconds`. A client that just wrote stays on the primary for
+    `sticky_seconds` so it always reads its own writes. The deadline travels
+    with the client (see `read_your_writes`) rather than living in this
+    process, so it holds whichever worker serves the next read; the clock is
+    wall time for the same reason.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: Sequence[async_sessionmaker[AsyncSession]] = (),
+        sticky_seconds: float = REPLICA_STICKY_SECONDS,
+        retry_seconds: float = REPLICA_RETRY_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._turn = itertools.count()
+        self._down_until: dict[int, float] = {}
+
+    def mark_write(self) -> Optional[float]:
+        """Until when the writing client should read from the primary; None without replicas."""
+        if not self.replicas:
+            return None
+        return self._clock() + self.sticky_seconds
+
+    def is_sticky(self, until: Optional[float]) -> bool:
+        if until is None:
+            return False
+        now = self._clock()
+        # Deadlines further out than one write could set are ignored, not honoured forever
+        return now < until <= now + self.sticky_seconds
+
+    def mark_down(self, replica: int) -> None:
+        self._down_until[replica] = self._clock() + self.retry_seconds
+
+    def mark_up(self, replica: int) -> None:
+        self._down_until.pop(replica, None)
+
+    def healthy_replicas(self) -> list[int]:
+        now = self._clock()
+        return [i for i in range(len(self.replicas)) if self._down_until.get(i, 0) <= now]
+
+    def pick(self, sticky_until: Optional[float] = None) -> tuple[async_sessionmaker[AsyncSession], Optional[int]]:
+        """Session factory to use, and the replica index (None for the primary)."""
+        if not self.replicas or self.is_sticky(sticky_until):
+            return self.primary, None
+        healthy = self.healthy_replicas()
+        if not healthy:
+            return self.primary, None
+        replica = healthy[next(self._turn) % len(healthy)]
+        return self.replicas[replica], replica
+
+    async def check_health(self) -> dict[int, bool]:
+        """Probe every replica with SELECT 1 and update its state."""
+        status = {}
+        for i, factory in enumerate(self.replicas):
+            try:
+                async with factory.kw["bind"].connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except (OperationalError, InterfaceError, OSError):
+                self.mark_down(i)
+                status[i] = False
+            else:
+                self.mark_up(i)
+                status[i] = True
+        return status
+
+read_router = ReadRouter(
+    SessionLocal,
+    [make_sessionmaker(make_engine(url)) for url in DATABASE_READ_URLS],
+)
+
 # Dependency for FastAPI
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
+
+def _sticky_until(request: Request) -> Optional[float]:
+    try:
+        return float(request.cookies[STICKY_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+# Dependency for read-only routes; falls back to the primary without replicas
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    factory, replica = read_router.pick(_sticky_until(request))
+    async with factory() as session:
+        try:
+            yield session
+        except (OperationalError, InterfaceError, OSError):
+            if replica is not None:
+                read_router.mark_down(replica)
+            raise
+
+# Route dependency for writes whose author should read them back right away
+def read_your_writes(response: Response) -> None:
+    until = read_router.mark_write()
+    if until is not None:
+        response.set_cookie(
+            STICKY_COOKIE, str(until), max_age=math.ceil(read_router.sticky_seconds), path="/api", httponly=True, samesite="lax"
+        )
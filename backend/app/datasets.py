@@ -0,0 +1,159 @@
+"""Bulk synthetic users and games for benchmarks and scaling tests.
+
+Rows are generated as plain tuples and written in large batches, skipping the
+ORM: one `executemany` per batch on SQLite and `COPY` on Postgres (asyncpg).
+Games are generated in `played_at` order, as real ones arrive, so the id and
+`played_at` indexes are appended to rather than split at random. Players'
+`high_score`/`games_played` are tallied along the way and written with one
+bulk update at the end. Scores follow a long-tailed distribution in steps of
+10 (one food), spread over the last `days` days.
+
+    python -m app.datasets --users 10000 --games 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .database import engine
+from .models import User as UserModel
+from .schemas import GameMode
+from .utils import get_password_hash
+
+DEFAULT_BATCH_SIZE = 100_000
+# Every seeded player logs in with this
+DEFAULT_PASSWORD = "password"
+GAME_COLUMNS = ("user_id", "score", "mode", "duration", "played_at")
+MEAN_SCORE = 150
+
+
+def _is_postgres(conn: AsyncConnection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+async def _copy_rows(conn: AsyncConnection, table: str, columns: Sequence[str], rows: list[tuple], epoch_column: Optional[str] = None) -> None:
+    """Write `rows`; `epoch_column` holds Unix timestamps to store as `played_at`-style datetimes."""
+    if _is_postgres(conn):
+        if epoch_column is not None:
+            at = columns.index(epoch_column)
+            rows = [(*row[:at], datetime.fromtimestamp(row[at], timezone.utc), *row[at + 1:]) for row in rows]
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table, records=rows, columns=list(columns))
+    else:
+        # Let SQLite format the timestamps; it's much faster than str(datetime) per row
+        placeholders = ", ".join("datetime(?, 'unixepoch')" if column == epoch_column else "?" for column in columns)
+        await conn.exec_driver_sql(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+async def insert_users(conn: AsyncConnection, count: int, prefix: str = "player") -> list[int]:
+    """Add `count` players named `<prefix><n>`; returns their ids."""
+    start = (await conn.scalar(select(func.max(UserModel.id)))) or 0
+    ids = list(range(start + 1, start + count + 1))
+    hashed = get_password_hash(DEFAULT_PASSWORD)  # argon2 is slow; hash once
+    now = int(time.time())
+    rows = [(i, f"{prefix}{i}", f"{prefix}{i}@example.com", hashed, now, 0, 0) for i in ids]
+    columns = ("id", "username", "email", "hashed_password", "created_at", "high_score", "games_played")
+    for offset in range(0, len(rows), DEFAULT_BATCH_SIZE):
+        await _copy_rows(conn, "users", columns, rows[offset:offset + DEFAULT_BATCH_SIZE], epoch_column="created_at")
+    if _is_postgres(conn) and ids:
+        # Explicit ids don't advance the sequence
+        await conn.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('users', 'id'), {ids[-1]})")
+    return ids
+
+
+def game_rows(
+    count: int, user_ids: Sequence[int], days: float = 365, seed: int = 0, now: Optional[float] = None
+) -> Iterator[tuple[int, int, str, int, int]]:
+    """(user_id, score, mode, duration, played_at as a Unix timestamp) in time order.
+
+    Reproducible for a given seed and `now`.
+    """
+    rng = random.Random(seed)
+    modes = [mode.value for mode in GameMode]
+    span = days * 86400
+    start = (time.time() if now is None else now) - span
+    step = span / count if count else 0
+    random_, choice, expovariate = rng.random, rng.choice, rng.expovariate
+    for i in range(count):
+        score = int(expovariate(1 / MEAN_SCORE)) // 10 * 10
+        yield (
+            choice(user_ids),
+            score,
+            choice(modes),
+            10 + score // 5 + int(random_() * 30),
+            int(start + (i + random_()) * step),
+        )
+
+
+async def insert_games(
+    conn: AsyncConnection,
+    count: int,
+    user_ids: Sequence[int],
+    days: float = 365,
+    seed: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Add `count` games for `user_ids` and bring the players' stats up to date; returns the count."""
+    high_scores = dict.fromkeys(user_ids, 0)
+    played = dict.fromkeys(user_ids, 0)
+    batch: list[tuple] = []
+    for row in game_rows(count, user_ids, days, seed):
+        user_id, score = row[0], row[1]
+        played[user_id] += 1
+        if score > high_scores[user_id]:
+            high_scores[user_id] = score
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await _copy_rows(conn, "games", GAME_COLUMNS, batch, epoch_column="played_at")
+            batch = []
+    if batch:
+        await _copy_rows(conn, "games", GAME_COLUMNS, batch, epoch_column="played_at")
+
+    stats = [
+        {"uid": user_id, "high": high_scores[user_id], "played": played[user_id]}
+        for user_id in user_ids
+        if played[user_id]
+    ]
+    if stats:
+        users = UserModel.__table__
+        await conn.execute(
+            update(users)
+            .where(users.c.id == bindparam("uid"))
+            .values(
+                high_score=case((users.c.high_score > bindparam("high"), users.c.high_score), else_=bindparam("high")),
+                games_played=users.c.games_played + bindparam("played"),
+            ),
+            stats,
+        )
+    return count
+
+
+async def populate(conn: AsyncConnection, users: int, games: int, days: float = 365, seed: int = 0) -> None:
+    """`users` players sharing `games` games."""
+    user_ids = await insert_users(conn, users)
+    await insert_games(conn, games, user_ids, days=days, seed=seed)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    try:
+        async with engine.begin() as conn:
+            await populate(conn, args.users, args.games, days=args.days, seed=args.seed)
+    finally:
+        await engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"{args.users} users, {args.games} games in {elapsed:.1f}s ({args.games / elapsed:,.0f} games/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-insert synthetic players and games into DATABASE_URL.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--days", type=float, default=365, help="spread games over this many past days")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,196 @@
+"""Streaming bulk export of games joined with the players who played them.
+
+Rows are pulled through a server-side cursor (`yield_per`) and encoded one
+chunk at a time, so memory stays flat no matter how big `games` gets. Used by
+the `/api/export/games` endpoint and by the CLI:
+
+    python -m app.export --format csv --after-id 41000 > games.csv
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import SessionLocal, engine
+from .models import Game as GameModel, User as UserModel
+from .schemas import ExportFormat
+
+EXPORT_COLUMNS = ("id", "user_id", "username", "score", "mode", "duration", "played_at")
+DEFAULT_CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+
+def export_query(since: Optional[datetime] = None, after_id: Optional[int] = None):
+    """Games joined with users in id order, optionally past a watermark."""
+    query = (
+        select(
+            GameModel.id,
+            GameModel.user_id,
+            UserModel.username,
+            GameModel.score,
+            GameModel.mode,
+            GameModel.duration,
+            GameModel.played_at,
+        )
+        .join(UserModel)
+        .order_by(GameModel.id)
+    )
+    if since is not None:
+        query = query.where(GameModel.played_at >= since)
+    if after_id is not None:
+        query = query.where(GameModel.id > after_id)
+    return query
+
+
+async def iter_chunks(
+    db: AsyncSession,
+    since: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[Sequence[Row]]:
+    """Yield lists of export rows, at most `chunk_size` at a time."""
+    query = export_query(since, after_id).execution_options(yield_per=chunk_size)
+    result = await db.stream(query)
+    try:
+        async for rows in result.partitions():
+            yield rows
+    finally:
+        await result.close()
+
+
+def _row_dict(row: Row) -> dict:
+    data = dict(zip(EXPORT_COLUMNS, row))
+    if data["played_at"] is not None:
+        data["played_at"] = data["played_at"].isoformat()
+    return data
+
+
+async def encode_ndjson(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield "".join(json.dumps(_row_dict(row)) + "\n" for row in rows).encode()
+
+
+async def encode_csv(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        for row in rows:
+            writer.writerow(_row_dict(row).values())
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, when there was nothing to export
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def encode_arrow(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """Arrow IPC stream, one record batch per chunk. Needs the optional `pyarrow`."""
+    import pyarrow as pa
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("username", pa.string()),
+        ("score", pa.int64()),
+        ("mode", pa.string()),
+        ("duration", pa.int64()),
+        ("played_at", pa.timestamp("us", tz="UTC")),
+    ])
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    async for rows in chunks:
+        columns = list(zip(*rows))
+        writer.write_batch(pa.record_batch([list(col) for col in columns], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    ExportFormat.NDJSON: encode_ndjson,
+    ExportFormat.CSV: encode_csv,
+    ExportFormat.ARROW: encode_arrow,
+}
+
+
+def format_available(fmt: ExportFormat) -> bool:
+    if fmt != ExportFormat.ARROW:
+        return True
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_export(
+    db: AsyncSession,
+    fmt: ExportFormat,
+    since: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    return ENCODERS[fmt](iter_chunks(db, since, after_id, chunk_size))
+
+
+async def _main(args: argparse.Namespace) -> None:
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async with SessionLocal() as db:
+            async for data in stream_export(db, args.format, args.since, args.after_id, args.chunk_size):
+                out.write(data)
+    finally:
+        if args.output:
+            out.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export games joined with users.")
+    parser.add_argument("--format", default=ExportFormat.NDJSON.value,
+                        choices=[f.value for f in ExportFormat])
+    parser.add_argument("--since", type=datetime.fromisoformat,
+                        help="Only games played at or after this ISO timestamp")
+    parser.add_argument("--after-id", type=int, help="Only games with an id above this watermark")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+    cli_args = parser.parse_args()
+    cli_args.format = ExportFormat(cli_args.format)
+    if not format_available(cli_args.format):
+        parser.error("arrow export requires pyarrow (pip install pyarrow)")
+    asyncio.run(_main(cli_args))
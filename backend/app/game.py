@@ -0,0 +1,209 @@
+"""Server-side snake simulation for multiplayer rooms.
+
+Same rules as the client (`frontend/src/game/gameLogic.ts`): snakes move one
+cell per tick, food is worth 10 and grows the snake, and the mode decides
+whether walls kill or wrap. Any snake's body is deadly, and a head-on crash
+kills both snakes.
+
+A tick only touches the cells that change. Each snake is a deque (push a head,
+pop a tail), occupancy is a dict keyed by cell, and new food is placed by
+random probing instead of scanning the grid. A tick therefore costs O(snakes +
+changed cells) whatever the grid size, and `tick()` returns just those changed
+cells for broadcasting.
+"""
+import random
+from collections import deque
+from typing import Optional
+
+Cell = tuple[int, int]
+
+DIRECTIONS: dict[str, Cell] = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+OPPOSITES = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+FOOD = "food"
+FOOD_POINTS = 10
+START_LENGTH = 3
+# Directions queued beyond this are dropped, so mashed keys can't build a backlog
+MAX_QUEUED_INPUTS = 3
+
+
+class Snake:
+    def __init__(self, snake_id: str, body: list[Cell], direction: str):
+        self.id = snake_id
+        self.body: deque[Cell] = deque(body)  # head first
+        self.direction = direction
+        self.inputs: deque[str] = deque(maxlen=MAX_QUEUED_INPUTS)
+        self.alive = True
+        self.score = 0
+
+    def next_direction(self) -> str:
+        while self.inputs:
+            direction = self.inputs.popleft()
+            if direction != OPPOSITES[self.direction] and direction != self.direction:
+                return direction
+        return self.direction
+
+
+class Board:
+    def __init__(self, grid_size: int = 20, mode: str = "walls", rng: Optional[random.Random] = None):
+        self.grid_size = grid_size
+        self.mode = mode
+        self.rng = rng or random.Random()
+        self.snakes: dict[str, Snake] = {}
+        self.cells: dict[Cell, str] = {}  # cell -> snake id or FOOD
+        self.tick_count = 0
+
+    @property
+    def alive(self) -> int:
+        return sum(snake.alive for snake in self.snakes.values())
+
+    def _free_cell(self) -> Optional[Cell]:
+        # Expected O(1) probes while the grid has room; scan only when it's nearly full
+        for _ in range(32):
+            cell = (self.rng.randrange(self.grid_size), self.rng.randrange(self.grid_size))
+            if cell not in self.cells:
+                return cell
+        free = [(x, y) for x in range(self.grid_size) for y in range(self.grid_size) if (x, y) not in self.cells]
+        return self.rng.choice(free) if free else None
+
+    def _place_food(self, changes: dict[Cell, Optional[str]]) -> None:
+        cell = self._free_cell()
+        if cell is not None:
+            self.cells[cell] = FOOD
+            changes[cell] = FOOD
+
+    def spawn(self, snake_id: str) -> Optional[dict[Cell, Optional[str]]]:
+        """Add (or revive) a snake heading right; returns the changed cells, or None if there's no room."""
+        if snake_id in self.snakes and self.snakes[snake_id].alive:
+            return {}
+        for _ in range(64):
+            x = self.rng.randrange(START_LENGTH - 1, self.grid_size - 2)
+            y = self.rng.randrange(self.grid_size)
+            # Leave a couple of free cells ahead so it doesn't spawn into a crash
+            body = [(x - i, y) for i in range(START_LENGTH)]
+            if all(cell not in self.cells for cell in body + [(x + 1, y), (x + 2, y)]):
+                break
+        else:
+            return None
+        snake = Snake(snake_id, body, "RIGHT")
+        self.snakes[snake_id] = snake
+        changes: dict[Cell, Optional[str]] = {}
+        for cell in body:
+            self.cells[cell] = snake_id
+            changes[cell] = snake_id
+        # One piece of food per living snake
+        for _ in range(self.alive - sum(1 for _ in self._food())):
+            self._place_food(changes)
+        return changes
+
+    def _food(self):
+        # Only used on spawn/snapshot; ticks track food through `cells`
+        return (cell for cell, owner in self.cells.items() if owner == FOOD)
+
+    def remove(self, snake_id: str) -> dict[Cell, Optional[str]]:
+        snake = self.snakes.pop(snake_id, None)
+        changes: dict[Cell, Optional[str]] = {}
+        if snake is not None and snake.alive:
+            self._clear_body(snake, changes)
+        return changes
+
+    def _clear_body(self, snake: Snake, changes: dict[Cell, Optional[str]]) -> None:
+        for cell in snake.body:
+            if self.cells.get(cell) == snake.id:
+                del self.cells[cell]
+                changes[cell] = None
+        snake.body.clear()
+        snake.alive = False
+
+    def steer(self, snake_id: str, direction: str) -> None:
+        snake = self.snakes.get(snake_id)
+        if snake is not None and snake.alive and direction in DIRECTIONS:
+            snake.inputs.append(direction)
+
+    def _step(self, cell: Cell, direction: str) -> Optional[Cell]:
+        dx, dy = DIRECTIONS[direction]
+        x, y = cell[0] + dx, cell[1] + dy
+        if self.mode == "pass-through":
+            return x % self.grid_size, y % self.grid_size
+        if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+            return x, y
+        return None
+
+    def tick(self) -> tuple[dict[Cell, Optional[str]], list[str], list[str]]:
+        """Advance every snake one cell.
+
+        Returns {cell: new owner or None}, the snakes that scored and the
+        snakes that died.
+        """
+        self.tick_count += 1
+        changes: dict[Cell, Optional[str]] = {}
+        moves: list[tuple[Snake, Optional[Cell], bool]] = []
+        for snake in self.snakes.values():
+            if not snake.alive:
+                continue
+            snake.direction = snake.next_direction()
+            head = self._step(snake.body[0], snake.direction)
+            moves.append((snake, head, head is not None and self.cells.get(head) == FOOD))
+
+        # Tails move out first, so a snake can follow its own or another's tail
+        for snake, head, grows in moves:
+            if not grows:
+                tail = snake.body.pop()
+                del self.cells[tail]
+                changes[tail] = None
+
+        heads: dict[Cell, list[Snake]] = {}
+        scored: list[str] = []
+        dead: list[Snake] = []
+        for snake, head, grows in moves:
+            owner = self.cells.get(head) if head is not None else None
+            if head is None or (owner is not None and owner != FOOD):
+                dead.append(snake)
+            else:
+                heads.setdefault(head, []).append(snake)
+        for head, snakes in heads.items():
+            if len(snakes) > 1:
+                dead.extend(snakes)
+                continue
+            snake = snakes[0]
+            if self.cells.get(head) == FOOD:
+                snake.score += FOOD_POINTS
+                scored.append(snake.id)
+            snake.body.appendleft(head)
+            self.cells[head] = snake.id
+            changes[head] = snake.id
+
+        for snake in dead:
+            self._clear_body(snake, changes)
+        for _ in scored:
+            self._place_food(changes)
+        return changes, scored, [snake.id for snake in dead]
+
+    def snapshot(self) -> dict:
+        return {
+            "tick": self.tick_count,
+            "gridSize": self.grid_size,
+            "mode": self.mode,
+            "snakes": {
+                snake.id: {
+                    "body": [list(cell) for cell in snake.body],
+                    "direction": snake.direction,
+                    "alive": snake.alive,
+                    "score": snake.score,
+                }
+                for snake in self.snakes.values()
+            },
+            "food": [list(cell) for cell in self._food()],
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict, rng: Optional[random.Random] = None) -> "Board":
+        board = cls(snapshot["gridSize"], snapshot["mode"], rng)
+        board.tick_count = snapshot["tick"]
+        for snake_id, state in snapshot["snakes"].items():
+            snake = Snake(snake_id, [tuple(cell) for cell in state["body"]], state["direction"])
+            snake.alive, snake.score = state["alive"], state["score"]
+            board.snakes[snake_id] = snake
+            board.cells.update({cell: snake_id for cell in snake.body})
+        board.cells.update({tuple(cell): FOOD for cell in snapshot["food"]})
+        return board
@@ -0,0 +1,117 @@
+"""Liveness and readiness state.
+
+Load balancers probe often, so readiness never opens a request session: the
+database check runs at most once per `READINESS_CACHE_SECONDS` across all
+concurrent probes, reuses a pooled connection, and is skipped outright while
+the pool is saturated so probes can't starve real traffic.
+"""
+import asyncio
+import math
+import os
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .database import engine
+
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+
+
+class Warmup:
+    """In-memory caches and indexes that have to be loaded before we're ready."""
+
+    def __init__(self):
+        self._warm: dict[str, bool] = {}
+
+    def register(self, name: str) -> None:
+        self._warm.setdefault(name, False)
+
+    def mark_warm(self, name: str) -> None:
+        self._warm[name] = True
+
+    def status(self) -> dict[str, bool]:
+        return dict(self._warm)
+
+    @property
+    def ready(self) -> bool:
+        return all(self._warm.values())
+
+
+warmup = Warmup()
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        # Static/Null pools have nothing to saturate
+        return {"size": None, "checkedOut": None, "overflow": None, "saturated": False}
+    checked_out = pool.checkedout()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    return {
+        "size": pool.size(),
+        "checkedOut": checked_out,
+        "overflow": pool.overflow(),
+        # A negative max_overflow means the pool can always grow
+        "saturated": max_overflow >= 0 and checked_out >= pool.size() + max_overflow,
+    }
+
+
+class ReadinessProbe:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        cache_seconds: float = READINESS_CACHE_SECONDS,
+        timeout: float = READINESS_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engine = engine
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._database: Optional[str] = None
+        self._error: Optional[str] = None
+        self._checked_at = -math.inf
+
+    def _fresh(self) -> bool:
+        return self._clock() - self._checked_at < self.cache_seconds
+
+    async def _check_database(self) -> None:
+        pool = pool_status(self.engine)
+        if pool["saturated"]:
+            # Every connection is busy serving requests; don't queue behind them
+            self._database = self._database or "unknown"
+            return
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with self.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self._database, self._error = "disconnected", str(e)
+        else:
+            self._database, self._error = "connected", None
+
+    async def check(self) -> dict:
+        if not self._fresh():
+            async with self._lock:
+                # Another probe may have refreshed it while we waited
+                if not self._fresh():
+                    await self._check_database()
+                    self._checked_at = self._clock()
+
+        report = {
+            "ready": self._database != "disconnected" and warmup.ready,
+            "database": self._database,
+            "pool": pool_status(self.engine),
+            "warmup": warmup.status(),
+            "checkedSecondsAgo": round(self._clock() - self._checked_at, 3),
+        }
+        if self._error:
+            report["error"] = self._error
+        return report
+
+
+readiness = ReadinessProbe(engine)
@@ -0,0 +1,200 @@
+"""Per-mode score histograms for percentiles and score distributions.
+
+Buckets are log-linear (HDR style): exact below 8, then 8 equal-width buckets
+per power of two, so any score lands in a bucket within 12.5% of its value and
+a 32-bit score range needs at most ~256 buckets. Everything here is O(buckets).
+
+Each worker counts its own submissions in memory. `sync()` merges workers:
+it adds the worker's not-yet-flushed counts into the `score_buckets` table
+(an upsert increment, so concurrent workers commute) and reloads the combined
+totals. `rebuild()` recomputes the table from the games on record; running
+workers would add their unsynced counts on top of it, so the app has to be
+stopped first (the CLI refuses while a worker holds the scheduler's leader lock).
+
+    python -m app.histograms sync
+    python -m app.histograms rebuild
+"""
+import argparse
+import asyncio
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import SessionLocal, engine
+from .models import ScoreBucket
+from .retention import scored_games
+from .schemas import GameMode
+
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def bucket_index(score: int) -> int:
+    if score < SUB_BUCKETS:
+        return max(score, 0)
+    shift = score.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (score >> shift) - SUB_BUCKETS
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """[lower, upper) scores of a bucket."""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    sub = index % SUB_BUCKETS + SUB_BUCKETS
+    return sub << shift, (sub + 1) << shift
+
+
+class ScoreHistogram:
+    def __init__(self, counts: Optional[dict[int, int]] = None):
+        self.counts: dict[int, int] = dict(counts or {})
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, score: int, count: int = 1) -> None:
+        index = bucket_index(score)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def merge(self, other: "ScoreHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+    def count_at_or_above(self, score: int) -> int:
+        """Scores >= `score`, counting everything in its bucket as tied with it."""
+        target = bucket_index(score)
+        return sum(count for index, count in self.counts.items() if index >= target)
+
+    def top_percent(self, score: int) -> Optional[float]:
+        """Share of scores at or above `score`, as a percentage ("top 3%")."""
+        total = self.total
+        if not total:
+            return None
+        return round(100 * self.count_at_or_above(score) / total, 2)
+
+    def buckets(self) -> list[tuple[int, int, int]]:
+        return [(*bucket_bounds(index), self.counts[index]) for index in sorted(self.counts)]
+
+
+class ScoreDistributions:
+    """One histogram per game mode, plus the counts this worker hasn't synced yet."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.merged = {mode.value: ScoreHistogram() for mode in GameMode}
+        self.pending = {mode.value: ScoreHistogram() for mode in GameMode}
+
+    def record(self, mode: str, score: int) -> None:
+        mode = GameMode(mode).value
+        self.merged[mode].add(score)
+        self.pending[mode].add(score)
+
+    def histogram(self, modes: Iterable[str]) -> ScoreHistogram:
+        combined = ScoreHistogram()
+        for mode in modes:
+            combined.merge(self.merged[GameMode(mode).value])
+        return combined
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Flush pending counts to `score_buckets` and reload everyone's totals."""
+        flushing = self.pending
+        self.pending = {mode.value: ScoreHistogram() for mode in GameMode}
+        rows = [
+            {"mode": mode, "bucket": index, "count": count}
+            for mode, histogram in flushing.items()
+            for index, count in histogram.counts.items()
+        ]
+        if rows:
+            try:
+                # The dialect packages are slow to import; only the first sync needs one
+                if db.get_bind().dialect.name == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(ScoreBucket)
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[ScoreBucket.mode, ScoreBucket.bucket],
+                        set_={"count": ScoreBucket.count + stmt.excluded.count},
+                    ),
+                    rows,
+                )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                # Not written; keep the counts for the next attempt
+                for mode, histogram in flushing.items():
+                    self.pending[mode].merge(histogram)
+                raise
+        try:
+            result = await db.execute(select(ScoreBucket.mode, ScoreBucket.bucket, ScoreBucket.count))
+        except Exception:
+            # The counts are committed; `merged` just stays stale until the next sync
+            await db.rollback()
+            raise
+
+        merged = {mode.value: ScoreHistogram() for mode in GameMode}
+        for mode, index, count in result.all():
+            if mode in merged:
+                merged[mode].counts[index] = count
+        # Submissions recorded while we were talking to the database
+        for mode, histogram in self.pending.items():
+            merged[mode].merge(histogram)
+        self.merged = merged
+
+    async def rebuild(self, db: AsyncSession, chunk_size: int = 10_000) -> None:
+        """Recompute `score_buckets` from the games on record.
+
+        Only safe with the app stopped: other workers' pending counts would be
+        added on top of the rebuilt totals. After a retention rollup only each rolled-up period's best game is on
+        record, so rebuilt histograms undercount those periods.
+        """
+        rebuilt = {mode.value: ScoreHistogram() for mode in GameMode}
+        games = scored_games()
+        result = await db.stream(select(games.c.mode, games.c.score).execution_options(yield_per=chunk_size))
+        async for mode, score in result:
+            if mode in rebuilt and score is not None:
+                rebuilt[mode].add(score)
+
+        await db.execute(delete(ScoreBucket))
+        rows = [
+            {"mode": mode, "bucket": index, "count": count}
+            for mode, histogram in rebuilt.items()
+            for index, count in histogram.counts.items()
+        ]
+        if rows:
+            await db.execute(ScoreBucket.__table__.insert(), rows)
+        await db.commit()
+        self.pending = {mode.value: ScoreHistogram() for mode in GameMode}
+        self.merged = rebuilt
+
+
+score_distributions = ScoreDistributions()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from .scheduler import LeaderLock
+    lock = LeaderLock()
+    if args.command == "rebuild" and not lock.acquire():
+        raise SystemExit("The app is running (a worker holds SCHEDULER_LOCK_PATH); stop it before rebuilding")
+    try:
+        async with SessionLocal() as db:
+            if args.command == "rebuild":
+                await score_distributions.rebuild(db)
+            else:
+                await score_distributions.sync(db)
+        for mode, histogram in score_distributions.merged.items():
+            print(f"{mode}: {histogram.total} games in {len(histogram.counts)} buckets")
+    finally:
+        lock.release()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the per-mode score histograms.")
+    parser.add_argument("command", choices=["sync", "rebuild"])
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,182 @@
+"""Idempotency keys for writes that clients retry.
+
+A client sends `Idempotency-Key: <unique string>` with a write and reuses it
+on retries. The first request runs and its response is kept for
+`IDEMPOTENCY_TTL_SECONDS` under (user, key); a retry gets that response back
+with `Idempotent-Replayed: true` instead of running the write again. A retry
+with a different body is rejected (422), and one that arrives while the first
+is still running gets 409 with Retry-After.
+
+Responses live in a bounded in-process dict: a lookup is one hash probe, and
+since every entry has the same TTL the oldest (first to expire or be evicted)
+are always at the front. A replay served from it never reaches the database.
+Each worker only knows its own keys, so with several workers set
+IDEMPOTENCY_PERSIST=1 to also store them in `idempotency_keys`, written in
+the same transaction as the write itself. Retries that land on another worker
+or come after a restart then cost one primary-key lookup.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import IdempotencyKey
+from .retention import as_utc
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+IDEMPOTENCY_PERSIST = os.getenv("IDEMPOTENCY_PERSIST", "").lower() in ("1", "true", "yes")
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Postgres's default name for the (user_id, key) primary key
+KEY_CONSTRAINT = f"{IdempotencyKey.__tablename__}_pkey"
+
+
+def fingerprint(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+def is_key_conflict(error: IntegrityError) -> bool:
+    """Whether `error` is another request having stored the same (user, key) first."""
+    # asyncpg's error is chained behind the DB-API one and names the constraint
+    constraint = getattr(error.orig.__cause__, "constraint_name", None)
+    if constraint is not None:
+        return constraint == KEY_CONSTRAINT
+    # SQLite only names the columns: "UNIQUE constraint failed: idempotency_keys.user_id, idempotency_keys.key"
+    return f"{IdempotencyKey.__tablename__}.key" in str(error.orig)
+
+
+def in_progress() -> HTTPException:
+    return HTTPException(status.HTTP_409_CONFLICT, "A request with this Idempotency-Key is in progress", headers={"Retry-After": "1"})
+
+
+def replay(response: str) -> Response:
+    return Response(response, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+
+class Claim:
+    """One request's hold on a key; `replay` is set instead when the key was already used."""
+
+    def __init__(self, store: "IdempotencyStore", user_id: int, key: str, fingerprint: str):
+        self.store = store
+        self.user_id = user_id
+        self.key = key
+        self.fingerprint = fingerprint
+        self.replay: Optional[Response] = None
+        self.response: Optional[str] = None
+
+    def save(self, db: AsyncSession, response: BaseModel) -> None:
+        """Keep the response; call before committing so a persisted key commits with the write."""
+        self.response = response.model_dump_json()
+        if self.store.persist:
+            db.add(IdempotencyKey(user_id=self.user_id, key=self.key, fingerprint=self.fingerprint, response=self.response))
+
+    async def stored(self, db: AsyncSession) -> Response:
+        """The response another worker committed for this key first."""
+        self.response = None  # ours was rolled back
+        row = await db.get(IdempotencyKey, (self.user_id, self.key))
+        if row is None:
+            raise in_progress()
+        self.store.check(row.fingerprint, self.fingerprint)
+        self.store.put((self.user_id, self.key), row.fingerprint, row.response)
+        return replay(row.response)
+
+
+class IdempotencyStore:
+    """Responses by (user id, key) as (expires at, fingerprint, response JSON), oldest first."""
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS,
+        persist: bool = IDEMPOTENCY_PERSIST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.persist = persist
+        self._clock = clock
+        self._entries: OrderedDict[tuple[int, str], tuple[float, str, str]] = OrderedDict()
+        self._pending: set[tuple[int, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[int, str]) -> Optional[tuple[str, str]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1], entry[2]
+
+    def put(self, key: tuple[int, str], fingerprint: str, response: str) -> None:
+        now = self._clock()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, fingerprint, response)
+        while self._entries and (len(self._entries) > self.max_keys or next(iter(self._entries.values()))[0] <= now):
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._pending.clear()
+
+    @staticmethod
+    def check(stored: str, requested: str) -> None:
+        if stored != requested:
+            raise HTTPException(status.HTTP_422_UNPROCESSABLE_CONTENT, "Idempotency-Key was already used with a different request")
+
+    async def _load(self, db: AsyncSession, user_id: int, key: str) -> Optional[IdempotencyKey]:
+        row = await db.get(IdempotencyKey, (user_id, key))
+        if row is None:
+            return None
+        if as_utc(row.created_at) > datetime.now(timezone.utc) - timedelta(seconds=self.ttl):
+            return row
+        # Expired but not pruned yet; make way for this request's row
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key))
+        return None
+
+    @asynccontextmanager
+    async def claim(self, db: AsyncSession, user_id: int, key: str, body: BaseModel) -> AsyncIterator[Claim]:
+        """Hold `key` while the request runs; the response saved on the claim is kept on success."""
+        claim = Claim(self, user_id, key, fingerprint(body))
+        cache_key = (user_id, key)
+        cached = self.get(cache_key)
+        if cached is not None:
+            self.check(cached[0], claim.fingerprint)
+            claim.replay = replay(cached[1])
+            yield claim
+            return
+        if cache_key in self._pending:
+            raise in_progress()
+        self._pending.add(cache_key)
+        try:
+            row = await self._load(db, user_id, key) if self.persist else None
+            if row is not None:
+                self.check(row.fingerprint, claim.fingerprint)
+                self.put(cache_key, row.fingerprint, row.response)
+                claim.replay = replay(row.response)
+            yield claim
+            if claim.response is not None:
+                self.put(cache_key, claim.fingerprint, claim.response)
+        finally:
+            self._pending.discard(cache_key)
+
+
+async def prune_expired(db: AsyncSession, ttl: float = IDEMPOTENCY_TTL_SECONDS, now: Optional[datetime] = None) -> int:
+    """Delete persisted keys older than `ttl` seconds; returns how many."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=ttl)
+    result = await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+store = IdempotencyStore()
@@ -0,0 +1,151 @@
+"""The app's background jobs, run by `app.scheduler` from the lifespan.
+
+Per worker: warming and refreshing the in-memory username index and score
+histograms, probing read replicas, pruning stale spectator entries, closing
+abandoned rooms and moving rooms when workers come and go.
+Leader only: recomputing `users.high_score`/`games_played` from the games on
+record, the daily games retention run and deleting expired idempotency keys.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import func, literal, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import health, idempotency
+from .database import SessionLocal, read_router
+from .histograms import score_distributions
+from .models import Game as GameModel, GameSummary, User as UserModel
+from .retention import as_utc, run_maintenance
+from .rooms import manager as room_manager
+from .routers import spectator
+from .scheduler import Scheduler
+from .sharding import ROOM_RING_REFRESH_SECONDS, placement
+from .search import username_index
+
+HISTOGRAM_SYNC_SECONDS = float(os.getenv("HISTOGRAM_SYNC_SECONDS", "10"))
+USERNAME_INDEX_REFRESH_SECONDS = float(os.getenv("USERNAME_INDEX_REFRESH_SECONDS", "300"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "15"))
+ACTIVE_PLAYER_MAX_AGE_SECONDS = float(os.getenv("ACTIVE_PLAYER_MAX_AGE_SECONDS", "3600"))
+USER_STATS_RECOMPUTE_SECONDS = float(os.getenv("USER_STATS_RECOMPUTE_SECONDS", "3600"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "86400"))
+IDEMPOTENCY_PRUNE_SECONDS = float(os.getenv("IDEMPOTENCY_PRUNE_SECONDS", "3600"))
+WARM_UP_RETRY_SECONDS = 5
+
+
+def with_session(func: Callable[[AsyncSession], Awaitable[object]]) -> Callable[[], Awaitable[object]]:
+    async def job():
+        async with SessionLocal() as db:
+            return await func(db)
+    return job
+
+
+def warm_up(name: str, load: Callable[[AsyncSession], Awaitable[object]]) -> Callable[[], Awaitable[None]]:
+    async def job():
+        async with SessionLocal() as db:
+            await load(db)
+        health.warmup.mark_warm(name)
+    return job
+
+
+async def recompute_user_stats(db: AsyncSession) -> int:
+    """Rewrite drifted `high_score`/`games_played` from games and summaries; returns users fixed.
+
+    One grouped pass over games and summaries, applied with UPDATE ... FROM.
+    A row is only written if its counters still hold the values read alongside
+    the totals, so a score submitted while the job runs is never overwritten.
+    """
+    # (user, score, games it stands for): each game counts once, a summary for its month
+    scores = union_all(
+        select(GameModel.user_id, GameModel.score, literal(1).label("games")),
+        select(GameSummary.user_id, GameSummary.best_score, GameSummary.games_played),
+    ).subquery()
+    totals = (
+        select(scores.c.user_id, func.max(scores.c.score).label("high_score"), func.sum(scores.c.games).label("games_played"))
+        .group_by(scores.c.user_id)
+        .subquery()
+    )
+    expected = (
+        select(
+            UserModel.id,
+            UserModel.high_score.label("old_high_score"),
+            UserModel.games_played.label("old_games_played"),
+            func.coalesce(totals.c.high_score, 0).label("high_score"),
+            func.coalesce(totals.c.games_played, 0).label("games_played"),
+        )
+        .outerjoin(totals, totals.c.user_id == UserModel.id)
+        .subquery()
+    )
+    result = await db.execute(
+        update(UserModel)
+        .where(
+            UserModel.id == expected.c.id,
+            or_(
+                expected.c.old_high_score.is_distinct_from(expected.c.high_score),
+                expected.c.old_games_played.is_distinct_from(expected.c.games_played),
+            ),
+            # Compare-and-set against the values the totals were read with
+            UserModel.high_score.is_not_distinct_from(expected.c.old_high_score),
+            UserModel.games_played.is_not_distinct_from(expected.c.old_games_played),
+        )
+        .values(high_score=expected.c.high_score, games_played=expected.c.games_played)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+def prune_active_players(max_age: float = ACTIVE_PLAYER_MAX_AGE_SECONDS, now: Optional[datetime] = None) -> int:
+    """Drop spectator entries for games started more than `max_age` seconds ago."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=max_age)
+    players = spectator.active_players
+    before = len(players)
+    players[:] = [player for player in players if as_utc(player.startedAt) >= cutoff]
+    return before - len(players)
+
+
+async def _prune_active_players() -> None:
+    prune_active_players()
+
+
+async def _close_idle_rooms() -> None:
+    room_manager.close_idle()
+
+
+def register(scheduler: Scheduler) -> None:
+    # Readiness waits on these; callers fall back to the database until then
+    for name, load in {"username_index": username_index.load, "score_histograms": score_distributions.sync}.items():
+        health.warmup.register(name)
+        scheduler.once(f"warm_{name}", warm_up(name, load), retry_seconds=WARM_UP_RETRY_SECONDS)
+
+    scheduler.every(
+        "sync_score_histograms", HISTOGRAM_SYNC_SECONDS, with_session(score_distributions.sync),
+        delay=HISTOGRAM_SYNC_SECONDS,
+    )
+    # Picks up usernames added through other workers
+    scheduler.every(
+        "refresh_username_index", USERNAME_INDEX_REFRESH_SECONDS, with_session(username_index.load),
+        delay=USERNAME_INDEX_REFRESH_SECONDS,
+    )
+    if read_router.replicas:
+        scheduler.every("check_replicas", REPLICA_CHECK_SECONDS, read_router.check_health)
+    scheduler.every("prune_active_players", 60, _prune_active_players)
+    scheduler.every("close_idle_rooms", 60, _close_idle_rooms)
+    if placement.sharded:
+        scheduler.every("rebalance_rooms", ROOM_RING_REFRESH_SECONDS, placement.rebalance)
+
+    scheduler.every(
+        "recompute_user_stats", USER_STATS_RECOMPUTE_SECONDS, with_session(recompute_user_stats),
+        leader=True,
+    )
+    # start.sh already runs it before the app starts
+    scheduler.every(
+        "games_retention", RETENTION_INTERVAL_SECONDS, with_session(run_maintenance),
+        delay=RETENTION_INTERVAL_SECONDS, leader=True,
+    )
+    if idempotency.store.persist:
+        scheduler.every(
+            "prune_idempotency_keys", IDEMPOTENCY_PRUNE_SECONDS, with_session(idempotency.prune_expired),
+            delay=IDEMPOTENCY_PRUNE_SECONDS, leader=True,
+        )
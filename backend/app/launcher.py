@@ -0,0 +1,172 @@
+"""Preforking launcher for the API.
+
+The app (and the modules it defers, like passlib) is imported once in the
+parent, then N uvicorn workers are forked off a shared listening socket, so
+every worker starts instantly and shares those pages copy-on-write. Workers
+that die are restarted; SIGTERM/SIGINT are forwarded to all of them. SIGTTIN
+adds a worker and SIGTTOU retires the newest one; workers place rooms among
+themselves over Unix sockets in ROOM_SOCKET_DIR (see `app.sharding`).
+
+    python -m app.launcher serve --host 127.0.0.1 --port 8000 --workers 4
+    python -m app.launcher wait-ready http://127.0.0.1:8000/api/health --timeout 60
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+WORKER_ID_ENV = "SNAKE_WORKER_ID"
+SOCKET_DIR_ENV = "ROOM_SOCKET_DIR"
+
+
+def preload():
+    """Import everything a worker needs before forking."""
+    from .main import app
+    from .utils import _pwd_context
+
+    _pwd_context()
+    return app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, index: int, log_level: str) -> None:
+    import uvicorn
+    from .database import engine
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(signum, signal.SIG_DFL)
+    os.environ[WORKER_ID_ENV] = str(index)
+    # Never share pooled connections with the parent
+    engine.sync_engine.dispose(close=False)
+
+    # X-Forwarded-For is resolved by ratelimit.client_ip, which knows how many
+    # proxies are in front of us; uvicorn's own handling only trusts one
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level, proxy_headers=False))
+    server.run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info") -> None:
+    started = time.perf_counter()
+    app = preload()
+    print(f"Preloaded app in {(time.perf_counter() - started) * 1000:.0f} ms", flush=True)
+
+    sock = bind_socket(host, port)
+    # Keep preloaded objects out of the collector so workers don't dirty their pages
+    gc.freeze()
+
+    socket_dir = os.environ.get(SOCKET_DIR_ENV)
+    own_socket_dir = not socket_dir
+    if own_socket_dir:
+        socket_dir = os.environ[SOCKET_DIR_ENV] = tempfile.mkdtemp(prefix="snake-party-rooms-")
+
+    children: dict[int, int] = {}
+    retiring: set[int] = set()
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, index, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def add_worker(signum, frame):
+        index = max(children.values(), default=-1) + 1
+        spawn(index)
+        print(f"Added worker {index}", flush=True)
+
+    def retire_worker(signum, frame):
+        active = {pid: index for pid, index in children.items() if pid not in retiring}
+        if len(active) > 1:
+            pid = max(active, key=active.get)
+            retiring.add(pid)
+            os.kill(pid, signal.SIGTERM)
+            print(f"Retiring worker {active[pid]}", flush=True)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTTIN, add_worker)
+    signal.signal(signal.SIGTTOU, retire_worker)
+
+    for index in range(workers):
+        spawn(index)
+    print(f"Serving on http://{host}:{port} with {workers} workers", flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if pid in retiring:
+            retiring.discard(pid)
+        elif index is not None and not stopping:
+            print(f"Worker {index} (pid {pid}) exited with status {status}, restarting", flush=True)
+            time.sleep(1)
+            spawn(index)
+    sock.close()
+    if own_socket_dir:
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def wait_ready(url: str, timeout: float = 60, interval: float = 0.2) -> bool:
+    """Poll `url` until it answers 200, for at most `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=interval * 5) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(interval)
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with preforked workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    serve_parser.add_argument("--log-level", default="info")
+
+    ready_parser = commands.add_parser("wait-ready")
+    ready_parser.add_argument("url")
+    ready_parser.add_argument("--timeout", type=float, default=60)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers, args.log_level)
+    else:
+        if not wait_ready(args.url, args.timeout):
+            print(f"{args.url} not ready after {args.timeout:.0f}s", file=sys.stderr)
+            sys.exit(1)
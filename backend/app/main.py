@@ -1,10 +1,29 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
-from .routers import auth, leaderboard, spectator, stats
-from .database import get_db
+from fastapi.responses import JSONResponse
+from .routers import auth, leaderboard, spectator, stats, export, players, rooms
+from . import health
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rooms, sharding and the job wiring load at startup rather than on import, keeping cold imports short
+    from . import jobs
+    from .rooms import manager as room_manager
+    from .scheduler import scheduler
+    from .sharding import placement
+
+    await placement.start()
+    if not scheduler.jobs:
+        jobs.register(scheduler)
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    await placement.stop()
+    await room_manager.stop()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Snake Party API",
     description="API for the Snake Party game including auth, leaderboards, and spectator features.",
     version="1.0.0",
@@ -26,26 +45,41 @@ app.add_middleware(
 def read_root():
     return {"message": "Welcome to Snake Party API", "docs": "/docs"}
 
+@app.get("/api/health/live")
+def liveness():
+    """The process is up and serving; says nothing about its dependencies."""
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    """Ready for traffic: database reachable and in-memory caches warmed up."""
+    report = await health.readiness.check()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 @app.get("/api/health")
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check():
     """Health check endpoint for monitoring and deployment verification."""
-    try:
-        # Test database connection
-        await db.execute("SELECT 1")
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "service": "Snake Party API"
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e)
-        }
+    report = await health.readiness.check()
+    body = {
+        "status": "healthy" if report["ready"] else "unhealthy",
+        "database": report["database"],
+        "service": "Snake Party API"
+    }
+    if "error" in report:
+        body["error"] = report["error"]
+    return JSONResponse(body, status_code=200 if report["ready"] else 503)
+
+@app.get("/api/health/jobs")
+async def jobs_status():
+    """Background jobs of this worker: run counts, failures and last-run durations."""
+    from .scheduler import scheduler
+    return scheduler.status()
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(leaderboard.router, prefix="/api")
 app.include_router(spectator.router, prefix="/api")
 app.include_router(stats.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+app.include_router(players.router, prefix="/api")
+app.include_router(rooms.router, prefix="/api")
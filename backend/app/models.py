@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import DDL, Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index, UniqueConstraint, event, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -16,9 +16,21 @@ class User(Base):
     high_score = Column(Integer, default=0)
     games_played = Column(Integer, default=0)
 
+    # Case-insensitive prefix search on usernames. Postgres gets its own copy
+    # below; spelling out `postgresql_ops` here would import the Postgres
+    # dialect on every start-up, SQLite included.
+    __table_args__ = (Index("ix_users_username_lower", func.lower(username)).ddl_if(dialect="sqlite"),)
+
     # Relationships
     games = relationship("Game", back_populates="user")
 
+# text_pattern_ops lets LIKE 'prefix%' use the index under any collation
+event.listen(
+    User.__table__,
+    "after_create",
+    DDL("CREATE INDEX ix_users_username_lower ON users (lower(username) text_pattern_ops)").execute_if(dialect="postgresql"),
+)
+
 class Game(Base):
     __tablename__ = "games"
 
@@ -27,7 +39,47 @@ class Game(Base):
     score = Column(Integer)
     mode = Column(String) # Storing info as string from GameMode enum
     duration = Column(Integer)
-    played_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Monthly range partition key on Postgres (see migrations)
+    played_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # A player's games per mode, best first: percentiles and stats recomputes
+    __table_args__ = (Index("ix_games_user_mode_score", "user_id", "mode", "score"),)
 
     # Relationships
     user = relationship("User", back_populates="games")
+
+class GameSummary(Base):
+    """Games past the retention window, rolled up per user, mode and month."""
+    __tablename__ = "game_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "mode", "period_start", name="uq_game_summaries_user_mode_period"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    mode = Column(String, nullable=False)
+    period_start = Column(DateTime(timezone=True), nullable=False)
+    games_played = Column(Integer, nullable=False, default=0)
+    total_score = Column(BigInteger, nullable=False, default=0)
+    total_duration = Column(BigInteger, nullable=False, default=0)
+    # The period's best game stands in for all of it on leaderboards and in ranks
+    best_score = Column(Integer, nullable=False)
+    best_played_at = Column(DateTime(timezone=True), nullable=False)
+
+class ScoreBucket(Base):
+    """Merged per-mode score histogram counts (see app/histograms.py)."""
+    __tablename__ = "score_buckets"
+
+    mode = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    """Stored responses to writes sent with an Idempotency-Key (see app/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
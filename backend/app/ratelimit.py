@@ -0,0 +1,137 @@
+"""Token-bucket rate limiting for expensive endpoints.
+
+Each limiter allows `burst` requests at once, refilled at `rate` per second,
+per key (client IP or user id). Buckets live in a bounded in-process LRU by
+default; set RATE_LIMIT_REDIS_URL to share them across workers (needs the
+optional `redis` package). Limits are configured as "<count>/<period>", e.g.
+RATE_LIMIT_LOGIN="10/minute".
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Proxies in front of the app whose X-Forwarded-For entries can be trusted:
+# 0 when clients connect directly, 1 behind start.sh's nginx, 2 behind Render + nginx
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+
+def parse_limit(limit: str) -> tuple[float, float]:
+    """Parse "10/minute" into (rate per second, burst)."""
+    count, _, period = limit.partition("/")
+    if period not in PERIODS:
+        raise ValueError(f"Invalid rate limit {limit!r}, expected <count>/<second|minute|hour>")
+    return int(count) / PERIODS[period], float(count)
+
+
+class MemoryBucketStore:
+    """Buckets as (tokens, last refill) in an LRU capped at `max_keys`."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """Spend `cost` tokens; returns 0 if allowed, else seconds until it would be."""
+        now = self._clock()
+        state = self._buckets.pop(key, None)
+        tokens = burst if state is None else min(burst, state[0] + (now - state[1]) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class RedisBucketStore:
+    """Same buckets kept in Redis, so every worker shares them."""
+
+    # Refill and spend atomically, on Redis' clock
+    SCRIPT = """
+    local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    local wait = 0
+    if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        return float(await self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, cost]))
+
+    def clear(self) -> None:
+        pass
+
+
+store = RedisBucketStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryBucketStore()
+
+
+def client_ip(request: Request) -> str:
+    """The address of the client, skipping RATE_LIMIT_TRUSTED_PROXIES hops.
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is the entry that many hops from the right,
+    counting the peer that connected to us. Anything further left was sent by
+    the client itself and can't be trusted.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if RATE_LIMIT_TRUSTED_PROXIES <= 0:
+        return peer
+    forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+    addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+    addresses.append(peer)
+    return addresses[max(len(addresses) - 1 - RATE_LIMIT_TRUSTED_PROXIES, 0)]
+
+
+class RateLimiter:
+    """A named limit, used as a FastAPI dependency through `by_ip` or `by_user`."""
+
+    def __init__(self, name: str, limit: str, bucket_store: Optional[MemoryBucketStore | RedisBucketStore] = None):
+        self.name = name
+        self.rate, self.burst = parse_limit(limit)
+        self._store = bucket_store
+
+    async def hit(self, key: str) -> None:
+        wait = await (self._store or store).take(f"{self.name}:{key}", self.rate, self.burst)
+        if wait > 0:
+            raise HTTPException(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    async def by_ip(self, request: Request) -> None:
+        await self.hit(f"ip:{client_ip(request)}")
+
+    def by_user(self, current_user_dependency: Callable) -> Callable:
+        """Limit per user; the dependency returns the user or just their id."""
+        async def dependency(current_user=Depends(current_user_dependency)) -> None:
+            await self.hit(f"user:{getattr(current_user, 'id', current_user)}")
+        return dependency
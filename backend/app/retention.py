@@ -0,0 +1,238 @@
+"""Monthly partitions for `games` and the retention/rollup job.
+
+On Postgres `games` is range-partitioned by `played_at` month (see the
+partition migration); this module keeps partitions created ahead of time and
+drops the ones that fall out of the retention window. SQLite has no
+partitioning, so there the job falls back to a range delete on the
+`played_at` index.
+
+Before anything is dropped, old games are rolled up into `game_summaries`:
+one row per user, mode and month keeping the counts, totals and the best game,
+so `users.high_score`/`games_played` stay exact. Leaderboards and ranks only
+see that best game: past the retention window a player has at most one entry
+per mode and month, and ranks count those entries rather than every game.
+
+    python -m app.retention --months 12
+"""
+import argparse
+import asyncio
+import os
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, desc, func, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import SessionLocal, engine
+from .models import Game as GameModel, GameSummary
+
+# Unset means keep games forever (only partition upkeep runs)
+GAMES_RETENTION_MONTHS = int(os.environ["GAMES_RETENTION_MONTHS"]) if os.getenv("GAMES_RETENTION_MONTHS") else None
+PARTITION_MONTHS_AHEAD = int(os.getenv("GAMES_PARTITION_MONTHS_AHEAD", "3"))
+
+PARTITION_NAME = re.compile(r"^games_y(\d{4})m(\d{2})$")
+DEFAULT_PARTITION = "games_default"
+
+
+def month_start(dt: datetime) -> datetime:
+    dt = as_utc(dt)
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(dt: datetime, months: int) -> datetime:
+    index = dt.year * 12 + dt.month - 1 + months
+    return dt.replace(year=index // 12, month=index % 12 + 1)
+
+
+def as_utc(dt: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they are stored in UTC
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"games_y{month.year}m{month.month:02d}"
+
+
+def scored_games():
+    """Every score that counts for leaderboards and ranks.
+
+    That is the retained games plus the best game of each rolled-up
+    (user, mode, month), exposed with the same column names as `games`. A
+    rolled-up month's other games no longer appear on leaderboards or push
+    anyone's rank down.
+    """
+    live = select(GameModel.user_id, GameModel.score, GameModel.mode, GameModel.played_at)
+    rolled_up = select(
+        GameSummary.user_id,
+        GameSummary.best_score,
+        GameSummary.mode,
+        GameSummary.best_played_at,
+    )
+    return union_all(live, rolled_up).subquery("scored_games")
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+async def ensure_partitions(db: AsyncSession, now: Optional[datetime] = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    """Create monthly partitions from this month up to `months_ahead` ahead (Postgres only).
+
+    Games played in a month that had no partition yet sit in the default
+    partition, and Postgres refuses to create a partition whose range would
+    strand them there. For such a month the default is detached while the
+    partition is created and its games are moved over, then reattached, all in
+    one transaction.
+    """
+    if _dialect(db) != "postgresql":
+        return []
+
+    created = []
+    month = month_start(now or datetime.now(timezone.utc))
+    for _ in range(months_ahead + 1):
+        name = partition_name(month)
+        upper = add_months(month, 1)
+        if (await db.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar() is None:
+            bounds = {"lower": month, "upper": upper}
+            in_range = "played_at >= :lower AND played_at < :upper"
+            stranded = (await db.execute(
+                text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"), bounds
+            )).scalar()
+            if stranded:
+                await db.execute(text(f"ALTER TABLE games DETACH PARTITION {DEFAULT_PARTITION}"))
+            await db.execute(text(
+                f"CREATE TABLE {name} PARTITION OF games "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            if stranded:
+                await db.execute(text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ), bounds)
+                await db.execute(text(f"ALTER TABLE games ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        created.append(name)
+        month = upper
+    await db.commit()
+    return created
+
+
+def _month_expr(dialect: str):
+    if dialect == "postgresql":
+        return func.date_trunc("month", GameModel.played_at)
+    return func.strftime("%Y-%m-01 00:00:00", GameModel.played_at)
+
+
+async def _drop_expired_partitions(db: AsyncSession, cutoff: datetime) -> list[str]:
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = 'games'"
+    ))
+    dropped = []
+    for name in result.scalars():
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+        if add_months(month, 1) <= cutoff:
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+async def rollup_and_prune(db: AsyncSession, retention_months: int, now: Optional[datetime] = None) -> dict:
+    """Roll games older than `retention_months` whole months into summaries, then drop them."""
+    dialect = _dialect(db)
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+
+    month = _month_expr(dialect)
+    window = (GameModel.user_id, GameModel.mode, month)
+    ranked = (
+        select(
+            GameModel.user_id,
+            GameModel.mode,
+            month.label("period_start"),
+            GameModel.score,
+            GameModel.played_at,
+            func.row_number().over(partition_by=window, order_by=(desc(GameModel.score), GameModel.played_at)).label("position"),
+            func.count().over(partition_by=window).label("games_played"),
+            func.coalesce(func.sum(GameModel.score).over(partition_by=window), 0).label("total_score"),
+            func.coalesce(func.sum(GameModel.duration).over(partition_by=window), 0).label("total_duration"),
+        )
+        .where(GameModel.played_at < cutoff, GameModel.user_id.is_not(None))
+        .subquery()
+    )
+    periods = (await db.execute(select(ranked).where(ranked.c.position == 1))).all()
+
+    # Merge into summaries left by earlier runs (late-arriving games, re-runs)
+    existing = (await db.execute(select(GameSummary).where(GameSummary.period_start < cutoff))).scalars()
+    summaries = {(s.user_id, s.mode, as_utc(s.period_start)): s for s in existing}
+
+    for row in periods:
+        period_start = row.period_start
+        if isinstance(period_start, str):
+            period_start = datetime.fromisoformat(period_start)
+        key = (row.user_id, row.mode, as_utc(period_start))
+        summary = summaries.get(key)
+        if summary is None:
+            summary = GameSummary(
+                user_id=row.user_id,
+                mode=row.mode,
+                period_start=key[2],
+                games_played=0,
+                total_score=0,
+                total_duration=0,
+                best_score=row.score,
+                best_played_at=row.played_at,
+            )
+            db.add(summary)
+            summaries[key] = summary
+        elif row.score > summary.best_score:
+            summary.best_score = row.score
+            summary.best_played_at = row.played_at
+        summary.games_played += row.games_played
+        summary.total_score += row.total_score
+        summary.total_duration += row.total_duration
+    await db.flush()
+
+    dropped = []
+    if dialect == "postgresql":
+        dropped = await _drop_expired_partitions(db, cutoff)
+    # Catches everything on SQLite, and stragglers in the default partition on Postgres
+    deleted = await db.execute(
+        delete(GameModel).where(GameModel.played_at < cutoff).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    return {
+        "cutoff": cutoff.isoformat(),
+        "summarized_periods": len(periods),
+        "dropped_partitions": dropped,
+        "deleted_games": deleted.rowcount,
+    }
+
+
+async def run_maintenance(db: AsyncSession, retention_months: Optional[int] = GAMES_RETENTION_MONTHS) -> dict:
+    report = {"created_partitions": await ensure_partitions(db)}
+    if retention_months is not None:
+        report.update(await rollup_and_prune(db, retention_months))
+    return report
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        async with SessionLocal() as db:
+            print(await run_maintenance(db, args.months))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming games partitions and roll up expired games.")
+    parser.add_argument("--months", type=int, default=GAMES_RETENTION_MONTHS,
+                        help="Retention window in whole months (default: GAMES_RETENTION_MONTHS, unset keeps everything)")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,316 @@
+"""Multiplayer party rooms, advanced by one fixed-rate tick loop per worker.
+
+Players join a room over HTTP to get a ticket, then connect a WebSocket with
+it; connections without a ticket spectate. Inputs are queued on the snake as
+they arrive and applied one per tick, so every room advances all of its
+snakes together. After each tick the room encodes one delta of the changed
+cells and hands the same string to every connection. A connection that falls
+`ROOM_SEND_BUFFER` messages behind drops its backlog and is sent a fresh
+snapshot instead of stalling the loop.
+
+A single ticker task advances every room in the worker, so hundreds of rooms
+cost one timer wake-up per tick rather than hundreds. Measure it with:
+
+    python -m app.rooms --rooms 500 --players 4 --grid 20 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from typing import Optional
+
+from .game import DIRECTIONS, Board
+
+logger = logging.getLogger(__name__)
+
+ROOM_TICK_RATE = float(os.getenv("ROOM_TICK_RATE", "10"))
+ROOM_MAX_PLAYERS = int(os.getenv("ROOM_MAX_PLAYERS", "8"))
+ROOM_IDLE_SECONDS = float(os.getenv("ROOM_IDLE_SECONDS", "300"))
+ROOM_SEND_BUFFER = 32
+
+
+class RoomFull(Exception):
+    pass
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+class Subscriber:
+    """One WebSocket's outgoing messages; `player_id` is None for spectators."""
+
+    def __init__(self, player_id: Optional[str] = None):
+        self.player_id = player_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(ROOM_SEND_BUFFER)
+        self.resyncs = 0
+
+    def send(self, message: str, room: "Room") -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind for deltas to help; start over from the current state
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(room.snapshot_message())
+            self.resyncs += 1
+
+
+class Room:
+    def __init__(self, room_id: str, mode: str = "walls", grid_size: int = 20, rng: Optional[random.Random] = None):
+        self.id = room_id
+        self.board = Board(grid_size, mode, rng)
+        self.players: dict[str, str] = {}  # player id -> username
+        self._tickets: dict[str, str] = {}  # ticket -> player id
+        self.subscribers: set[Subscriber] = set()
+        # Cells changed between ticks (joins, leaves), sent with the next delta
+        self._pending: dict = {}
+        self.idle_since: Optional[float] = time.monotonic()
+        # Set while the room is handed to another worker; it stops ticking
+        self.moving = False
+
+    def join(self, player_id: str, username: str) -> str:
+        """Ticket for the player's WebSocket; joining again returns the same one."""
+        for ticket, owner in self._tickets.items():
+            if owner == player_id:
+                return ticket
+        if len(self.players) >= ROOM_MAX_PLAYERS:
+            raise RoomFull(self.id)
+        ticket = secrets.token_urlsafe(16)
+        self._tickets[ticket] = player_id
+        self.players[player_id] = username
+        return ticket
+
+    def player_for(self, ticket: str) -> Optional[str]:
+        return self._tickets.get(ticket)
+
+    def spawn(self, player_id: str) -> bool:
+        changes = self.board.spawn(player_id)
+        if changes is None:
+            return False
+        self._pending.update(changes)
+        return True
+
+    def steer(self, player_id: str, direction: str) -> None:
+        self.board.steer(player_id, direction)
+
+    def handle(self, player_id: Optional[str], message: object) -> None:
+        """Apply a message from a player's connection; spectators are read-only."""
+        if player_id is None or not isinstance(message, dict):
+            return
+        if message.get("type") == "input":
+            self.steer(player_id, message.get("direction"))
+        elif message.get("type") == "respawn":
+            self.spawn(player_id)
+
+    def subscribe(self, player_id: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(player_id)
+        subscriber.send(self.snapshot_message(), self)
+        self.subscribers.add(subscriber)
+        self.idle_since = None
+        return subscriber
+
+    def leave(self, player_id: str) -> None:
+        """Free the player's seat; they need a new ticket from `join` to play again."""
+        self._pending.update(self.board.remove(player_id))
+        self.players.pop(player_id, None)
+        self._tickets = {ticket: owner for ticket, owner in self._tickets.items() if owner != player_id}
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+        player_id = subscriber.player_id
+        if player_id is not None and not any(s.player_id == player_id for s in self.subscribers):
+            # The player's last connection closed; their snake and seat go with them
+            self.leave(player_id)
+        if not self.subscribers:
+            self.idle_since = time.monotonic()
+
+    def tick(self) -> Optional[str]:
+        """Advance the board and broadcast the delta; returns it, or None if nothing changed."""
+        if self.board.alive:
+            changes, scored, died = self.board.tick()
+        elif self._pending:
+            changes, scored, died = {}, [], []
+        else:
+            return None
+        if self._pending:
+            changes = {**self._pending, **changes}
+            self._pending = {}
+        snakes = self.board.snakes
+        message = _encode({
+            "type": "tick",
+            "tick": self.board.tick_count,
+            "cells": [[x, y, owner] for (x, y), owner in changes.items()],
+            "scores": {snake_id: snakes[snake_id].score for snake_id in scored},
+            "died": died,
+        })
+        for subscriber in self.subscribers:
+            subscriber.send(message, self)
+        return message
+
+    def snapshot_message(self) -> str:
+        return _encode({"type": "snapshot", "roomId": self.id, "players": self.players, **self.board.snapshot()})
+
+    def close(self, reason: str = "closed") -> None:
+        """Tell every connection the room is gone ("closed") or lives elsewhere now ("moved")."""
+        message = _encode({"type": reason, "roomId": self.id})
+        for subscriber in self.subscribers:
+            subscriber.send(message, self)
+
+    def export_state(self) -> dict:
+        return {"roomId": self.id, "players": self.players, "tickets": self._tickets, "board": self.board.snapshot()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Room":
+        room = cls(state["roomId"])
+        room.board = Board.from_snapshot(state["board"])
+        room.players = dict(state["players"])
+        room._tickets = dict(state["tickets"])
+        return room
+
+    def info(self) -> dict:
+        return {
+            "id": self.id,
+            "mode": self.board.mode,
+            "gridSize": self.board.grid_size,
+            "players": len(self.players),
+            "spectators": sum(1 for s in self.subscribers if s.player_id is None),
+            "tick": self.board.tick_count,
+        }
+
+
+class RoomManager:
+    def __init__(self, tick_rate: float = ROOM_TICK_RATE):
+        self.tick_rate = tick_rate
+        self.rooms: dict[str, Room] = {}
+        self.overruns = 0
+        self.last_tick_seconds = 0.0
+        self._ticker: Optional[asyncio.Task] = None
+
+    def create(self, mode: str = "walls", grid_size: int = 20, room_id: Optional[str] = None) -> Room:
+        room = Room(room_id or secrets.token_urlsafe(6), mode, grid_size)
+        self.rooms[room.id] = room
+        return room
+
+    def adopt(self, room: Room) -> None:
+        self.rooms[room.id] = room
+        self.ensure_running()
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self.rooms.get(room_id)
+
+    def close(self, room_id: str) -> None:
+        room = self.rooms.pop(room_id, None)
+        if room is not None:
+            room.close()
+
+    def close_idle(self, max_idle: float = ROOM_IDLE_SECONDS) -> int:
+        now = time.monotonic()
+        idle = [room.id for room in self.rooms.values() if room.idle_since is not None and now - room.idle_since > max_idle]
+        for room_id in idle:
+            self.close(room_id)
+        return len(idle)
+
+    def tick_all(self) -> None:
+        for room in list(self.rooms.values()):
+            if room.moving:
+                continue
+            try:
+                room.tick()
+            except Exception:
+                logger.exception("Room %s failed to tick, closing it", room.id)
+                self.close(room.id)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            started = loop.time()
+            self.tick_all()
+            self.last_tick_seconds = loop.time() - started
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Fell behind; skip the missed ticks rather than bursting through them
+                self.overruns += 1
+                next_tick, delay = loop.time(), 0
+            await asyncio.sleep(delay)
+
+    def ensure_running(self) -> None:
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+
+    def clear(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        self.rooms.clear()
+
+
+manager = RoomManager()
+
+
+def benchmark(rooms: int, players: int, grid_size: int, seconds: float, tick_rate: float, seed: int = 0) -> dict:
+    """Tick `rooms` rooms of random-walking bots on one core for `seconds`."""
+    rng = random.Random(seed)
+    bench = RoomManager(tick_rate)
+    for i in range(rooms):
+        room = Room(f"bench-{i}", rng.choice(["walls", "pass-through"]), grid_size, random.Random(seed + i))
+        bench.rooms[room.id] = room
+        for p in range(players):
+            room.join(f"bot-{p}", f"bot-{p}")
+            room.spawn(f"bot-{p}")
+        # One connection per room, so encoding the delta is part of the cost
+        room.subscribe()
+    subscribers = [subscriber for room in bench.rooms.values() for subscriber in room.subscribers]
+    directions = list(DIRECTIONS)
+
+    ticks, busy = 0, 0.0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for room in bench.rooms.values():
+            for snake in room.board.snakes.values():
+                if not snake.alive:
+                    room.spawn(snake.id)
+                elif rng.random() < 0.1:
+                    room.steer(snake.id, rng.choice(directions))
+        started = time.perf_counter()
+        bench.tick_all()
+        busy += time.perf_counter() - started
+        ticks += 1
+        for subscriber in subscribers:
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+
+    per_tick = busy / ticks
+    return {
+        "ticks": ticks,
+        "msPerTick": round(per_tick * 1000, 3),
+        "usPerRoomTick": round(per_tick / rooms * 1e6, 2),
+        # Rooms one core could keep at `tick_rate` with the loop fully busy
+        "roomsPerCore": int(rooms / (per_tick * tick_rate)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark room ticks on one core.")
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--grid", type=int, nargs="+", default=[20, 200], help="grid sizes to compare")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--tick-rate", type=float, default=ROOM_TICK_RATE)
+    args = parser.parse_args()
+    for grid_size in args.grid:
+        result = benchmark(args.rooms, args.players, grid_size, args.seconds, args.tick_rate)
+        print(f"grid {grid_size}x{grid_size}: " + ", ".join(f"{key}={value}" for key, value in result.items()))
@@ -2,17 +2,40 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+import os
 from uuid import uuid4
 from ..models import User as UserModel
 from ..schemas import User, UserCreate, UserLogin, AuthResponse, UserBase
-from ..database import get_db
+from ..database import get_db, read_your_writes
 from ..utils import verify_password, get_password_hash
+from ..ratelimit import RateLimiter
+from ..search import username_index
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+# Password hashing is deliberately slow, so throttle who can make us do it
+login_limit = RateLimiter("login", os.getenv("RATE_LIMIT_LOGIN", "10/minute"))
+signup_limit = RateLimiter("signup", os.getenv("RATE_LIMIT_SIGNUP", "5/minute"))
+
+# Unique index (Postgres) / column (SQLite) named in the IntegrityError -> 409 detail
+UNIQUE_CONFLICTS = (
+    (("ix_users_email", "users.email"), "Email already exists"),
+    (("ix_users_username", "users.username"), "Username already taken"),
+)
+
+def _conflict_detail(error: IntegrityError) -> str:
+    message = str(error.orig)
+    for names, detail in UNIQUE_CONFLICTS:
+        if any(name in message for name in names):
+            return detail
+    raise error
+
+def token_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """The user id a bearer token claims, checked without touching the database."""
     if not token.startswith("mock-jwt-token-"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,7 +45,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     
     user_id_str = token.replace("mock-jwt-token-", "")
     try:
-        user_id = int(user_id_str)
+        return int(user_id_str)
     except ValueError:
          raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +53,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+async def get_current_user(user_id: int = Depends(token_user_id), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(UserModel).where(UserModel.id == user_id))
     user = result.scalars().first()
     
@@ -41,7 +65,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         )
     return user
 
-@router.post("/login", response_model=AuthResponse)
+@router.post("/login", response_model=AuthResponse, dependencies=[Depends(login_limit.by_ip)])
 async def login(creds: UserLogin, db: AsyncSession = Depends(get_db)):
     print(f"DEBUG: Login attempt for {creds.email}")
     result = await db.execute(select(UserModel).where(UserModel.email == creds.email))
@@ -59,29 +83,24 @@ async def login(creds: UserLogin, db: AsyncSession = Depends(get_db)):
         
     return {"user": user, "token": f"mock-jwt-token-{user.id}"}
 
-@router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(signup_limit.by_ip), Depends(read_your_writes)])
 async def signup(creds: UserCreate, db: AsyncSession = Depends(get_db)):
-    # Check email
-    result = await db.execute(select(UserModel).where(UserModel.email == creds.email))
-    if result.scalars().first():
-        raise HTTPException(status.HTTP_409_CONFLICT, "Email already exists")
-    
-    # Check username
-    result = await db.execute(select(UserModel).where(UserModel.username == creds.username))
-    if result.scalars().first():
-        raise HTTPException(status.HTTP_409_CONFLICT, "Username already taken")
-    
-    new_user = UserModel(
+    # The unique indexes on email/username do the checking, in the same round trip as the insert
+    insert_user = insert(UserModel).values(
         username=creds.username,
         email=creds.email,
         hashed_password=get_password_hash(creds.password),
         created_at=datetime.now(),
         high_score=0,
         games_played=0
-    )
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    ).returning(UserModel)
+    try:
+        new_user = (await db.execute(insert_user)).scalar_one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status.HTTP_409_CONFLICT, _conflict_detail(e))
+    username_index.add(new_user.id, new_user.username)
     
     return {"user": new_user, "token": f"mock-jwt-token-{new_user.id}"}
 
@@ -93,15 +112,14 @@ async def logout(current_user: UserModel = Depends(get_current_user)):
 async def get_me(current_user: UserModel = Depends(get_current_user)):
     return current_user
 
-@router.patch("/me", response_model=User)
+@router.patch("/me", response_model=User, dependencies=[Depends(read_your_writes)])
 async def update_me(update: UserBase, current_user: UserModel = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    if update.email != current_user.email:
-         result = await db.execute(select(UserModel).where(UserModel.email == update.email))
-         if result.scalars().first():
-             raise HTTPException(status.HTTP_409_CONFLICT, "Email already exists")
-    
     current_user.username = update.username
     current_user.email = update.email
-    await db.commit()
-    await db.refresh(current_user)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status.HTTP_409_CONFLICT, _conflict_detail(e))
+    username_index.add(current_user.id, current_user.username)
     return current_user
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas import ExportFormat
+from ..database import get_read_db
+from ..export import MEDIA_TYPES, DEFAULT_CHUNK_SIZE, format_available, stream_export
+from ..ratelimit import RateLimiter
+from .auth import get_current_user
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# A full export streams every game, so signed-in players only, and not often
+export_limit = RateLimiter("export", os.getenv("RATE_LIMIT_EXPORT", "10/hour"))
+
+@router.get("/games", dependencies=[Depends(export_limit.by_user(get_current_user))])
+async def export_games(
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: Optional[datetime] = None,
+    after_id: Optional[int] = Query(None, alias="afterId"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, alias="chunkSize", ge=1, le=50_000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Stream every game joined with its player.
+
+    `since` (played_at) and `afterId` (games.id) are watermarks for incremental
+    exports; rows always come out in id order, so the last id seen is the next
+    `afterId`.
+    """
+    if not format_available(format):
+        raise HTTPException(status.HTTP_501_NOT_IMPLEMENTED, "Arrow export requires pyarrow")
+
+    return StreamingResponse(
+        stream_export(db, format, since, after_id, chunk_size),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="games.{format.value}"'},
+    )
@@ -1,46 +1,66 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Header, status, HTTPException
 from typing import List, Optional
 from datetime import date
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import desc, func
+from sqlalchemy.exc import IntegrityError
 from ..models import Game as GameModel, User as UserModel
 from ..schemas import LeaderboardEntry, GameMode, GameResult
-from ..database import get_db
-from .auth import get_current_user
+from ..database import get_db, get_read_db, read_your_writes
+from ..retention import scored_games
+from ..ratelimit import RateLimiter
+from ..histograms import score_distributions
+from .. import idempotency
+from .auth import get_current_user, token_user_id
 
 router = APIRouter(prefix="/leaderboards", tags=["leaderboards"])
 
+score_limit = RateLimiter("scores", os.getenv("RATE_LIMIT_SCORES", "30/minute"))
+
 @router.get("", response_model=List[LeaderboardEntry])
-async def get_leaderboard(mode: Optional[GameMode] = None, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    query = select(GameModel, UserModel).join(UserModel).order_by(desc(GameModel.score))
+async def get_leaderboard(mode: Optional[GameMode] = None, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
+    games = scored_games()
+    query = select(games, UserModel.username).join(UserModel, UserModel.id == games.c.user_id).order_by(desc(games.c.score))
     
     if mode:
-        query = query.where(GameModel.mode == mode)
+        query = query.where(games.c.mode == mode)
     
     query = query.limit(limit)
     
     result = await db.execute(query)
-    games = result.all()
     
     entries = []
-    for i, (game, user) in enumerate(games):
+    for i, game in enumerate(result.all()):
         entries.append(LeaderboardEntry(
             rank=i + 1,
-            userId=str(user.id),
-            username=user.username,
+            userId=str(game.user_id),
+            username=game.username,
             score=game.score,
             mode=game.mode,
             date=game.played_at.date()
         ))
     return entries
 
-@router.post("/scores", response_model=Optional[LeaderboardEntry], status_code=status.HTTP_200_OK)
+@router.post("/scores", response_model=Optional[LeaderboardEntry], status_code=status.HTTP_200_OK, dependencies=[Depends(read_your_writes), Depends(score_limit.by_user(token_user_id))])
 async def submit_score(
     result: GameResult, 
-    current_user: UserModel = Depends(get_current_user), 
+    user_id: int = Depends(token_user_id),
+    idempotency_key: Optional[str] = Header(None, max_length=idempotency.IDEMPOTENCY_KEY_MAX_LENGTH),
     db: AsyncSession = Depends(get_db)
 ):
+    if idempotency_key is None:
+        return await _record_score(result, user_id, db)
+    # Retries with the same key get the first response back without touching the database
+    async with idempotency.store.claim(db, user_id, idempotency_key, result) as claim:
+        if claim.replay is not None:
+            return claim.replay
+        return await _record_score(result, user_id, db, claim)
+
+async def _record_score(result: GameResult, user_id: int, db: AsyncSession, claim: Optional[idempotency.Claim] = None):
+    current_user = await get_current_user(user_id, db)
+
     # Record the game
     new_game = GameModel(
         user_id=current_user.id,
@@ -55,19 +75,24 @@ async def submit_score(
     if result.score > current_user.high_score:
         current_user.high_score = result.score
     
-    # Commit changes
-    await db.commit()
+    # A persisted idempotency key has to commit with the game, so hold the commit until the response is built
+    deferred = claim is not None and claim.store.persist
+    if deferred:
+        await db.flush()
+    else:
+        await db.commit()
     await db.refresh(new_game)
     
     # Calculate rank (basic implementation: count games with higher score in same mode)
-    rank_query = select(func.count()).select_from(GameModel).where(
-        GameModel.mode == result.mode,
-        GameModel.score > result.score
+    games = scored_games()
+    rank_query = select(func.count()).select_from(games).where(
+        games.c.mode == result.mode,
+        games.c.score > result.score
     )
     rank_res = await db.execute(rank_query)
     rank = rank_res.scalar() + 1
     
-    return LeaderboardEntry(
+    entry = LeaderboardEntry(
         rank=rank,
         userId=str(current_user.id),
         username=current_user.username,
@@ -75,26 +100,40 @@ async def submit_score(
         mode=new_game.mode,
         date=new_game.played_at.date()
     )
+    if claim is not None:
+        claim.save(db, entry)
+    if deferred:
+        try:
+            await db.commit()
+        except IntegrityError as error:
+            if not idempotency.is_key_conflict(error):
+                raise
+            # Another worker committed a request with the same key first
+            await db.rollback()
+            return await claim.stored(db)
+    score_distributions.record(new_game.mode, new_game.score)
+    return entry
 
 @router.get("/rank/{userId}", response_model=dict)
-async def get_user_rank(userId: str, db: AsyncSession = Depends(get_db)):
+async def get_user_rank(userId: str, db: AsyncSession = Depends(get_read_db)):
     # Find user's best game
     try:
         uid = int(userId)
     except ValueError:
         return {"rank": None}
 
-    best_game_query = select(GameModel).where(GameModel.user_id == uid).order_by(desc(GameModel.score)).limit(1)
+    games = scored_games()
+    best_game_query = select(games).where(games.c.user_id == uid).order_by(desc(games.c.score)).limit(1)
     res = await db.execute(best_game_query)
-    best_game = res.scalars().first()
+    best_game = res.first()
     
     if not best_game:
         return {"rank": None}
     
     # Calculate global rank for that score/mode
-    rank_query = select(func.count()).select_from(GameModel).where(
-        GameModel.mode == best_game.mode,
-        GameModel.score > best_game.score
+    rank_query = select(func.count()).select_from(games).where(
+        games.c.mode == best_game.mode,
+        games.c.score > best_game.score
     )
     rank_res = await db.execute(rank_query)
     rank = rank_res.scalar() + 1
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas import PlayerSearchPage
+from ..database import get_read_db
+from ..search import search_players
+
+router = APIRouter(prefix="/players", tags=["players"])
+
+@router.get("/search", response_model=PlayerSearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Players whose username starts with `q`, case-insensitively."""
+    players, total = await search_players(db, q, limit, offset)
+    return {
+        "results": [{"userId": str(user_id), "username": username} for user_id, username in players],
+        "total": total,
+    }
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from typing import List, Optional
+from ..schemas import RoomCreate, RoomInfo, RoomTicket
+from ..models import User as UserModel
+from .auth import get_current_user
+
+router = APIRouter(prefix="/rooms", tags=["rooms"])
+
+def _placement():
+    # Sharding brings in the room engine and worker plumbing; load it with the first room request
+    from ..sharding import placement
+    return placement
+
+ERRORS = {
+    "not_found": (status.HTTP_404_NOT_FOUND, "Room not found"),
+    "full": (status.HTTP_409_CONFLICT, "Room is full"),
+    "unavailable": (status.HTTP_503_SERVICE_UNAVAILABLE, "Room is temporarily unavailable"),
+}
+
+def _check(reply: dict) -> dict:
+    if "error" in reply:
+        raise HTTPException(*ERRORS.get(reply["error"], (status.HTTP_500_INTERNAL_SERVER_ERROR, "Room error")))
+    return reply
+
+@router.get("", response_model=List[RoomInfo])
+async def list_rooms():
+    return await _placement().list_rooms()
+
+@router.post("", response_model=RoomInfo, status_code=status.HTTP_201_CREATED)
+async def create_room(body: RoomCreate, current_user: UserModel = Depends(get_current_user)):
+    return _check(await _placement().create(body.mode.value, body.gridSize))["room"]
+
+@router.get("/{roomId}", response_model=RoomInfo)
+async def get_room(roomId: str):
+    return _check(await _placement().call(roomId, {"op": "info"}))["room"]
+
+@router.post("/{roomId}/join", response_model=RoomTicket)
+async def join_room(roomId: str, current_user: UserModel = Depends(get_current_user)):
+    """Ticket to play through `/rooms/{roomId}/ws?ticket=...`."""
+    player_id = str(current_user.id)
+    reply = _check(await _placement().call(roomId, {"op": "join", "playerId": player_id, "username": current_user.username}))
+    return {"roomId": roomId, "playerId": player_id, "ticket": reply["ticket"]}
+
+@router.websocket("/{roomId}/ws")
+async def room_socket(websocket: WebSocket, roomId: str, ticket: Optional[str] = None):
+    """Play with a ticket from `/join`, or spectate without one.
+
+    Players send `{"type": "input", "direction": "UP"}` and, after dying,
+    `{"type": "respawn"}`. Everyone receives a `snapshot` first, then one
+    `tick` delta of changed cells per tick. The room may run in another
+    worker, and may move between workers mid-game; either way this
+    connection stays up and gets a fresh `snapshot` after a move.
+    """
+    placement = _placement()
+    stream = await placement.open(roomId, ticket)
+    if stream is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    async def send_updates():
+        nonlocal stream
+        while True:
+            message = await stream.receive()
+            if message.startswith('{"type":"moved"'):
+                await stream.close()
+                stream = await placement.reopen(roomId, ticket)
+                if stream is None:
+                    await websocket.close()
+                    return
+                continue
+            await websocket.send_text(message)
+            if message.startswith('{"type":"closed"'):
+                await websocket.close()
+                return
+
+    sender = asyncio.create_task(send_updates())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if stream is None:
+                # The room went away under a frame already in flight; the sender closed the socket
+                break
+            await stream.send(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        if stream is not None:
+            await stream.close()
@@ -2,14 +2,17 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
-from ..models import User as UserModel, Game as GameModel
-from ..schemas import UserStats, GlobalStats
-from ..database import get_db
+from typing import Optional
+from ..models import User as UserModel, Game as GameModel, GameSummary
+from ..schemas import UserStats, GlobalStats, GameMode, ScoreDistribution, ScorePercentile
+from ..database import get_read_db
+from ..retention import scored_games
+from ..histograms import score_distributions
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 @router.get("/user/{userId}", response_model=UserStats)
-async def get_user_stats(userId: str, db: AsyncSession = Depends(get_db)):
+async def get_user_stats(userId: str, db: AsyncSession = Depends(get_read_db)):
     try:
         uid = int(userId)
     except ValueError:
@@ -37,7 +40,7 @@ async def get_user_stats(userId: str, db: AsyncSession = Depends(get_db)):
     # avg_score = avg_res.scalar() or 0
 
 @router.get("/global", response_model=GlobalStats)
-async def get_global_stats(db: AsyncSession = Depends(get_db)):
+async def get_global_stats(db: AsyncSession = Depends(get_read_db)):
     # Total players
     players_res = await db.execute(select(func.count(UserModel.id)))
     total_players = players_res.scalar() or 0
@@ -45,9 +48,13 @@ async def get_global_stats(db: AsyncSession = Depends(get_db)):
     # Total games (sum of users.games_played or count of games table)
     games_res = await db.execute(select(func.count(GameModel.id)))
     total_games = games_res.scalar() or 0
+    # Plus games already rolled up past the retention window
+    rolled_up_res = await db.execute(select(func.sum(GameSummary.games_played)))
+    total_games += rolled_up_res.scalar() or 0
     
     # Highest score
-    score_res = await db.execute(select(func.max(GameModel.score)))
+    games = scored_games()
+    score_res = await db.execute(select(func.max(games.c.score)))
     highest_score = score_res.scalar() or 0
 
     return {
@@ -55,3 +62,37 @@ async def get_global_stats(db: AsyncSession = Depends(get_db)):
         "totalGames": total_games,
         "highestScore": highest_score
     }
+
+@router.get("/distribution", response_model=ScoreDistribution)
+async def get_score_distribution(mode: Optional[GameMode] = None):
+    # Served from the in-memory histograms, no database round trip. Async so it
+    # reads them on the event loop, never while record()/sync() change them
+    histogram = score_distributions.histogram([mode] if mode else list(GameMode))
+    return {
+        "mode": mode,
+        "total": histogram.total,
+        "buckets": [{"min": lower, "max": upper - 1, "count": count} for lower, upper, count in histogram.buckets()]
+    }
+
+@router.get("/percentile/{userId}", response_model=ScorePercentile)
+async def get_user_percentile(userId: str, mode: GameMode, db: AsyncSession = Depends(get_read_db)):
+    try:
+        uid = int(userId)
+    except ValueError:
+         raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+
+    # Two index lookups, ix_games_user_mode_score and the summaries' unique key,
+    # instead of filtering scored_games()
+    best_res = await db.execute(select(
+        select(func.max(GameModel.score)).where(GameModel.user_id == uid, GameModel.mode == mode).scalar_subquery(),
+        select(func.max(GameSummary.best_score)).where(GameSummary.user_id == uid, GameSummary.mode == mode).scalar_subquery(),
+    ))
+    best_score = max((score for score in best_res.one() if score is not None), default=None)
+
+    histogram = score_distributions.histogram([mode])
+    return {
+        "mode": mode,
+        "score": best_score,
+        "topPercent": histogram.top_percent(best_score) if best_score is not None else None,
+        "total": histogram.total
+    }
@@ -0,0 +1,193 @@
+"""In-process scheduler for background and maintenance jobs.
+
+Jobs are plain `async def` functions, run once (optionally retried until they
+succeed) or every `interval` seconds plus up to `jitter` seconds, so workers
+started together don't hit the database in lockstep. A periodic run that is
+still going when the next one is due is skipped rather than stacked up past
+`max_instances`, and at most `SCHEDULER_MAX_CONCURRENCY` jobs run at once per
+worker so maintenance can't take over the connection pool.
+
+Every worker runs its own copy of jobs that maintain in-memory state. Jobs
+registered with `leader=True` write shared data and only run in the worker
+holding the leader lock, an `flock` on `SCHEDULER_LOCK_PATH`. The lock is
+released when the holder exits, and another worker takes it over on its next
+due run. It covers the workers on one host (see `app.launcher`).
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LOCK_PATH = os.getenv(
+    "SCHEDULER_LOCK_PATH", os.path.join(tempfile.gettempdir(), "snake-party-scheduler.lock")
+)
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "2"))
+
+
+class LeaderLock:
+    """Non-blocking exclusive file lock, held until `release()` or exit."""
+
+    def __init__(self, path: str = SCHEDULER_LOCK_PATH):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[object]]
+    interval: Optional[float] = None  # None runs once
+    delay: float = 0
+    jitter: float = 0
+    leader: bool = False
+    max_instances: int = 1
+    retry_seconds: Optional[float] = None  # one-shot jobs only
+    running: int = 0
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_started_at: Optional[datetime] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    done: bool = False
+    tasks: set = field(default_factory=set, repr=False)
+
+    def status(self) -> dict:
+        """Public view of the job; the error itself only goes to the log, it can carry SQL or connection details."""
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "leader": self.leader,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "lastStartedAt": self.last_started_at.isoformat() if self.last_started_at else None,
+            "lastDurationSeconds": None if self.last_duration is None else round(self.last_duration, 3),
+            "lastRunFailed": self.last_error is not None,
+            "done": self.done,
+        }
+
+
+class Scheduler:
+    def __init__(
+        self,
+        leader_lock: Optional[LeaderLock] = None,
+        max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.leader_lock = leader_lock or LeaderLock()
+        self.max_concurrency = max_concurrency
+        self._clock = clock
+        self.jobs: dict[str, Job] = {}
+        self._loops: list[asyncio.Task] = []
+        self._limit: Optional[asyncio.Semaphore] = None
+
+    def add(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name!r} is already scheduled")
+        self.jobs[job.name] = job
+        if self._limit is not None:
+            self._loops.append(asyncio.create_task(self._loop(job)))
+        return job
+
+    def every(self, name: str, interval: float, func: Callable[[], Awaitable[object]], *, jitter: Optional[float] = None, **options) -> Job:
+        """Run `func` every `interval` seconds; jitter defaults to 10% of the interval."""
+        return self.add(Job(name, func, interval=interval, jitter=interval / 10 if jitter is None else jitter, **options))
+
+    def once(self, name: str, func: Callable[[], Awaitable[object]], **options) -> Job:
+        return self.add(Job(name, func, **options))
+
+    def start(self) -> None:
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._loops = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    async def stop(self) -> None:
+        tasks = self._loops + [task for job in self.jobs.values() for task in job.tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops = []
+        self._limit = None
+        self.leader_lock.release()
+
+    def status(self) -> dict:
+        return {
+            "leader": self.leader_lock.held,
+            "jobs": [job.status() for job in self.jobs.values()],
+        }
+
+    async def _loop(self, job: Job) -> None:
+        await asyncio.sleep(job.delay + random.uniform(0, job.jitter))
+        if job.interval is None:
+            while not await self._run(job) and job.retry_seconds is not None:
+                await asyncio.sleep(job.retry_seconds)
+            job.done = True
+            return
+        while True:
+            self._launch(job)
+            await asyncio.sleep(job.interval + random.uniform(0, job.jitter))
+
+    def _launch(self, job: Job) -> None:
+        if job.running >= job.max_instances:
+            job.skipped += 1
+            return
+        task = asyncio.create_task(self._run(job))
+        job.tasks.add(task)
+        task.add_done_callback(job.tasks.discard)
+
+    async def _run(self, job: Job) -> bool:
+        if job.leader and not self.leader_lock.acquire():
+            return True  # another worker runs it
+        job.running += 1
+        try:
+            async with self._limit:
+                job.last_started_at = datetime.now(timezone.utc)
+                started = self._clock()
+                try:
+                    await job.func()
+                except Exception as e:
+                    job.failures += 1
+                    job.last_error = f"{type(e).__name__}: {e}"
+                    logger.exception("Job %s failed", job.name)
+                else:
+                    job.last_error = None
+                # Not reached by runs cancelled on shutdown
+                job.runs += 1
+                job.last_duration = self._clock() - started
+                return job.last_error is None
+        finally:
+            job.running -= 1
+
+
+scheduler = Scheduler()
@@ -7,6 +7,11 @@ class GameMode(str, Enum):
     PASS_THROUGH = "pass-through"
     WALLS = "walls"
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    ARROW = "arrow"
+
 class UserBase(BaseModel):
     username: str
     email: EmailStr
@@ -52,6 +57,30 @@ class ActivePlayer(BaseModel):
 class SpectatorCount(BaseModel):
     count: int
 
+class PlayerSearchResult(BaseModel):
+    userId: str
+    username: str
+
+class PlayerSearchPage(BaseModel):
+    results: List[PlayerSearchResult]
+    total: int
+
+class DistributionBucket(BaseModel):
+    min: int
+    max: int
+    count: int
+
+class ScoreDistribution(BaseModel):
+    mode: Optional[GameMode]
+    total: int
+    buckets: List[DistributionBucket]
+
+class ScorePercentile(BaseModel):
+    mode: GameMode
+    score: Optional[int]
+    topPercent: Optional[float]
+    total: int
+
 class UserStats(BaseModel):
     highScore: int
     gamesPlayed: int
@@ -61,3 +90,21 @@ class GlobalStats(BaseModel):
     totalPlayers: int
     totalGames: int
     highestScore: int
+
+class RoomCreate(BaseModel):
+    mode: GameMode = GameMode.WALLS
+    gridSize: int = Field(20, ge=10, le=200)
+
+class RoomInfo(BaseModel):
+    id: str
+    mode: GameMode
+    gridSize: int
+    players: int
+    spectators: int
+    tick: int
+    worker: str
+
+class RoomTicket(BaseModel):
+    roomId: str
+    playerId: str
+    ticket: str
@@ -0,0 +1,95 @@
+"""Case-insensitive username prefix search.
+
+Each worker keeps every username in a sorted array and answers prefix queries
+with two binary searches. `signup` and `update_me` keep it current for their
+own writes; other workers' signups show up when the `refresh_username_index`
+job reloads it. Until the
+index is loaded, lookups fall back to a `LIKE 'prefix%'` scan of the
+functional `lower(username)` index. A `>=`/`<` range would be shorter, but
+under a non-C collation strings don't sort by code point and the range would
+miss or add matches.
+"""
+from bisect import bisect_left, insort
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User as UserModel
+
+
+def like_prefix(prefix: str) -> str:
+    """LIKE pattern matching strings that start with `prefix`, escaped with a backslash."""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class UsernameIndex:
+    def __init__(self):
+        # (lowercased username, user id, username), kept sorted
+        self._entries: list[tuple[str, int, str]] = []
+        self._by_id: dict[int, str] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def load(self, db: AsyncSession) -> None:
+        result = await db.execute(select(UserModel.id, UserModel.username).where(UserModel.username.is_not(None)))
+        rows = result.all()
+        self._entries = sorted((username.lower(), user_id, username) for user_id, username in rows)
+        self._by_id = {user_id: username for user_id, username in rows}
+        self.loaded = True
+
+    def add(self, user_id: int, username: str) -> None:
+        """Insert a user, or move them if their username changed."""
+        if self._by_id.get(user_id) == username:
+            return
+        self.remove(user_id)
+        insort(self._entries, (username.lower(), user_id, username))
+        self._by_id[user_id] = username
+
+    def remove(self, user_id: int) -> None:
+        username = self._by_id.pop(user_id, None)
+        if username is None:
+            return
+        entry = (username.lower(), user_id, username)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def search(self, prefix: str, limit: int, offset: int = 0) -> tuple[list[tuple[int, str]], int]:
+        """Matching (user id, username) pairs for one page, and the total match count."""
+        prefix = prefix.lower()
+        lo = bisect_left(self._entries, (prefix,))
+        hi = bisect_left(self._entries, (prefix_upper_bound(prefix),))
+        page = self._entries[lo + offset:min(hi, lo + offset + limit)]
+        return [(user_id, username) for _, user_id, username in page], hi - lo
+
+
+username_index = UsernameIndex()
+
+
+async def search_players(
+    db: AsyncSession, prefix: str, limit: int, offset: int = 0, index: Optional[UsernameIndex] = None
+) -> tuple[list[tuple[int, str]], int]:
+    if index is None:
+        index = username_index
+    if index.loaded:
+        return index.search(prefix, limit, offset)
+
+    lowered = func.lower(UserModel.username)
+    matches = (lowered.like(like_prefix(prefix.lower()), escape="\\"),)
+    total = (await db.execute(select(func.count()).select_from(UserModel).where(*matches))).scalar()
+    result = await db.execute(
+        select(UserModel.id, UserModel.username)
+        .where(*matches)
+        .order_by(lowered, UserModel.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return [tuple(row) for row in result.all()], total
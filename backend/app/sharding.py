@@ -0,0 +1,367 @@
+"""Room placement across worker processes.
+
+Under `app.launcher` each worker also listens on a Unix socket,
+`worker-<id>.sock` in ROOM_SOCKET_DIR. Room ids are assigned to workers by a
+consistent hash ring built from the sockets in that directory, so every room
+lives in exactly one worker, whichever worker the kernel hands a connection
+to. A request for a room owned elsewhere is forwarded over the owner's socket
+as one JSON line per request and per reply. For WebSockets the IPC
+connection stays open and carries room messages both ways.
+
+When a worker is added (SIGTTIN to the launcher), only the rooms the ring now
+assigns to it move: about 1/N of them. Each worker sees the new socket on its
+next `rebalance`, sends those rooms' state to the new owner, and tells their
+connections the room moved. The WebSocket handler then reconnects to the new
+owner without the client noticing beyond a fresh snapshot. A worker that
+shuts down hands its rooms off the same way.
+
+Without ROOM_SOCKET_DIR (plain uvicorn, tests) every room is local.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import secrets
+from bisect import bisect, insort
+from typing import Iterable, Optional
+
+from .launcher import SOCKET_DIR_ENV, WORKER_ID_ENV
+from .rooms import Room, RoomFull, RoomManager, manager
+
+logger = logging.getLogger(__name__)
+
+ROOM_RING_REFRESH_SECONDS = float(os.getenv("ROOM_RING_REFRESH_SECONDS", "1"))
+VNODES = 64
+# Snapshots of big grids can be far larger than asyncio's 64 KiB default line limit
+LINE_LIMIT = 16 * 1024 * 1024
+REOPEN_ATTEMPTS = 20
+REOPEN_DELAY = 0.1
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def _line(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class HashRing:
+    """Consistent hashing with `vnodes` points per node."""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = VNODES):
+        self.vnodes = vnodes
+        self.nodes: set[str] = set()
+        self._points: list[tuple[int, str]] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            insort(self._points, (_hash(f"{node}#{i}"), node))
+
+    def remove(self, node: str) -> None:
+        self.nodes.discard(node)
+        self._points = [point for point in self._points if point[1] != node]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        i = bisect(self._points, (_hash(key), "")) % len(self._points)
+        return self._points[i][1]
+
+
+class LocalStream:
+    """A connection to a room in this worker."""
+
+    def __init__(self, rooms: RoomManager, room: Room, player_id: Optional[str]):
+        self.room = room
+        self.player_id = player_id
+        rooms.ensure_running()
+        if player_id is not None:
+            room.spawn(player_id)
+        self.subscriber = room.subscribe(player_id)
+
+    async def receive(self) -> str:
+        return await self.subscriber.queue.get()
+
+    async def send(self, message: object) -> None:
+        self.room.handle(self.player_id, message)
+
+    async def close(self) -> None:
+        self.room.unsubscribe(self.subscriber)
+
+
+class RemoteStream:
+    """A connection to a room in another worker, over its Unix socket."""
+
+    def __init__(self, room_id: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.room_id = room_id
+        self.reader = reader
+        self.writer = writer
+
+    async def receive(self) -> str:
+        line = await self.reader.readline()
+        if not line:
+            # The owner went away; look the room up again
+            return json.dumps({"type": "moved", "roomId": self.room_id}, separators=(",", ":"))
+        return line.decode().rstrip("\n")
+
+    async def send(self, message: object) -> None:
+        try:
+            self.writer.write(_line(message))
+            await self.writer.drain()
+        except (ConnectionError, RuntimeError):
+            pass
+
+    async def close(self) -> None:
+        self.writer.close()
+
+
+class RoomPlacement:
+    def __init__(self, rooms: RoomManager):
+        self.rooms = rooms
+        self.worker_id = "0"
+        self.socket_dir: Optional[str] = None
+        self.ring = HashRing([self.worker_id])
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def sharded(self) -> bool:
+        return self._server is not None
+
+    def socket_path(self, worker_id: str) -> str:
+        return os.path.join(self.socket_dir, f"worker-{worker_id}.sock")
+
+    async def start(self) -> None:
+        self.worker_id = os.getenv(WORKER_ID_ENV, "0")
+        self.socket_dir = os.getenv(SOCKET_DIR_ENV)
+        self.ring = HashRing([self.worker_id])
+        if not self.socket_dir:
+            return
+        path = self.socket_path(self.worker_id)
+        if os.path.exists(path):
+            os.unlink(path)  # left over from a crashed predecessor
+        self._server = await asyncio.start_unix_server(self._serve_peer, path, limit=LINE_LIMIT)
+        self.refresh()
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        try:
+            os.unlink(self.socket_path(self.worker_id))
+        except FileNotFoundError:
+            pass  # already removed, e.g. by a cleanup after a crash
+        self.refresh(include_self=False)
+        await self._hand_off(list(self.rooms.rooms))
+        self._server = None
+
+    def refresh(self, include_self: bool = True) -> bool:
+        """Rebuild the ring from the sockets on disk; returns whether it changed."""
+        if not self.socket_dir:
+            return False
+        workers = {
+            name[len("worker-"):-len(".sock")]
+            for name in os.listdir(self.socket_dir)
+            if name.startswith("worker-") and name.endswith(".sock")
+        }
+        if include_self:
+            workers.add(self.worker_id)
+        if workers == self.ring.nodes:
+            return False
+        self.ring = HashRing(workers)
+        return True
+
+    async def rebalance(self) -> None:
+        """Hand off every room the ring places elsewhere, including ones a failed hand-off left behind."""
+        if not self.sharded:
+            return
+        self.refresh()
+        misplaced = [
+            room_id for room_id, room in self.rooms.rooms.items()
+            if not room.moving and self.owner(room_id) != self.worker_id
+        ]
+        await self._hand_off(misplaced)
+
+    async def _hand_off(self, room_ids: list[str]) -> None:
+        for room_id in room_ids:
+            room = self.rooms.get(room_id)
+            owner = self.owner(room_id)
+            if room is None or owner is None or owner == self.worker_id:
+                continue
+            room.moving = True
+            try:
+                reply = await self._request(owner, {"op": "adopt", "state": room.export_state()})
+            except OSError:
+                reply = {}
+            if reply.get("ok"):
+                del self.rooms.rooms[room_id]
+                room.close("moved")
+            else:
+                logger.warning("Worker %s didn't take room %s; keeping it", owner, room_id)
+                room.moving = False
+
+    def owner(self, room_id: str) -> Optional[str]:
+        return self.ring.owner(room_id)
+
+    def _is_local(self, room_id: str) -> bool:
+        # A room we still hold is served here even if the ring has moved on
+        return not self.sharded or room_id in self.rooms.rooms or self.owner(room_id) == self.worker_id
+
+    def _info(self, room: Room) -> dict:
+        return {**room.info(), "worker": self.worker_id}
+
+    def _handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "list":
+            return {"rooms": [self._info(room) for room in self.rooms.rooms.values()]}
+        if op == "create":
+            return {"room": self._info(self.rooms.create(request["mode"], request["gridSize"], request["roomId"]))}
+        if op == "adopt":
+            self.rooms.adopt(Room.from_state(request["state"]))
+            return {"ok": True}
+        room = self.rooms.get(request.get("roomId"))
+        if room is None:
+            return {"error": "not_found"}
+        if op == "info":
+            return {"room": self._info(room)}
+        if op == "join":
+            try:
+                return {"ticket": room.join(request["playerId"], request["username"])}
+            except RoomFull:
+                return {"error": "full"}
+        return {"error": "bad_request"}
+
+    async def _request(self, worker_id: str, request: dict) -> dict:
+        reader, writer = await asyncio.open_unix_connection(self.socket_path(worker_id), limit=LINE_LIMIT)
+        try:
+            writer.write(_line(request))
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError(f"worker {worker_id} closed the connection")
+            return json.loads(line)
+        finally:
+            writer.close()
+
+    async def call(self, room_id: str, request: dict) -> dict:
+        """Run `request` in the worker that owns `room_id`."""
+        request = {**request, "roomId": room_id}
+        if self._is_local(room_id):
+            return self._handle(request)
+        try:
+            return await self._request(self.owner(room_id), request)
+        except OSError:
+            # The owner is restarting or gone; the ring catches up on the next refresh
+            self.refresh()
+            return {"error": "unavailable"}
+
+    async def create(self, mode: str, grid_size: int) -> dict:
+        room_id = secrets.token_urlsafe(6)
+        return await self.call(room_id, {"op": "create", "mode": mode, "gridSize": grid_size})
+
+    async def list_rooms(self) -> list[dict]:
+        rooms = self._handle({"op": "list"})["rooms"]
+        if not self.sharded:
+            return rooms
+        others = [worker for worker in self.ring.nodes if worker != self.worker_id]
+        replies = await asyncio.gather(*(self._request(worker, {"op": "list"}) for worker in others), return_exceptions=True)
+        for reply in replies:
+            if isinstance(reply, dict):
+                rooms.extend(reply["rooms"])
+        return rooms
+
+    def _open_local(self, room_id: str, ticket: Optional[str]) -> Optional[LocalStream]:
+        room = self.rooms.get(room_id)
+        if room is None or room.moving:
+            return None
+        player_id = room.player_for(ticket) if ticket else None
+        if ticket and player_id is None:
+            return None
+        return LocalStream(self.rooms, room, player_id)
+
+    async def _open(self, room_id: str, ticket: Optional[str]) -> Optional[LocalStream | RemoteStream]:
+        if self._is_local(room_id):
+            return self._open_local(room_id, ticket)
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path(self.owner(room_id)), limit=LINE_LIMIT)
+        except OSError:
+            return None
+        writer.write(_line({"op": "connect", "roomId": room_id, "ticket": ticket}))
+        await writer.drain()
+        reply = await reader.readline()
+        if not reply or not json.loads(reply).get("ok"):
+            writer.close()
+            return None
+        return RemoteStream(room_id, reader, writer)
+
+    async def open(self, room_id: str, ticket: Optional[str], attempts: int = 1) -> Optional[LocalStream | RemoteStream]:
+        """Stream of the room's messages; retried while a move settles."""
+        for attempt in range(attempts):
+            stream = await self._open(room_id, ticket)
+            if stream is not None or attempt == attempts - 1:
+                return stream
+            await asyncio.sleep(REOPEN_DELAY)
+            self.refresh()
+        return None
+
+    async def reopen(self, room_id: str, ticket: Optional[str]) -> Optional[LocalStream | RemoteStream]:
+        self.refresh()
+        return await self.open(room_id, ticket, attempts=REOPEN_ATTEMPTS)
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            if request.get("op") != "connect":
+                writer.write(_line(self._handle(request)))
+                await writer.drain()
+                return
+            stream = self._open_local(request["roomId"], request.get("ticket"))
+            if stream is None:
+                writer.write(_line({"error": "not_found"}))
+                await writer.drain()
+                return
+            writer.write(_line({"ok": True}))
+            await self._pump(stream, reader, writer)
+        except (ConnectionError, ValueError):
+            pass
+        except Exception:
+            logger.exception("Room IPC request failed")
+        finally:
+            writer.close()
+
+    async def _pump(self, stream: LocalStream, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def updates():
+            while True:
+                message = await stream.receive()
+                writer.write(message.encode() + b"\n")
+                await writer.drain()
+                if message.startswith(('{"type":"closed"', '{"type":"moved"')):
+                    return
+
+        async def inputs():
+            while line := await reader.readline():
+                try:
+                    await stream.send(json.loads(line))
+                except ValueError:
+                    pass
+
+        tasks = [asyncio.create_task(updates()), asyncio.create_task(inputs())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await stream.close()
+
+
+placement = RoomPlacement(manager)
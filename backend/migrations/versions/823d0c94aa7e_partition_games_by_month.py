@@ -0,0 +1,137 @@
+"""Partition games by month and add game summaries
+
+Revision ID: 823d0c94aa7e
+Revises: 1982082f4b7f
+Create Date: 2026-10-19 10:12:41.310274
+
+On Postgres `games` becomes a table range-partitioned by `played_at` month,
+with a default partition catching anything outside the created ranges (the
+retention job in app/retention.py keeps upcoming partitions created). The
+primary key has to include the partition key, so it becomes (id, played_at).
+
+SQLite has no partitioning; it only gets an index on `played_at` so the
+retention job's range delete stays cheap.
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '823d0c94aa7e'
+down_revision: Union[str, Sequence[str], None] = '1982082f4b7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _month_starts(first: datetime, months_ahead: int):
+    now = datetime.now(timezone.utc)
+    month = first.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    index = now.year * 12 + now.month - 1 + months_ahead
+    last = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    while month <= last:
+        upper = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+        yield month, upper
+        month = upper
+
+
+def _rename_constraints(table: str) -> None:
+    """Move the old table's constraint names out of the way, so the new `games` keeps the usual ones."""
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT games_pkey TO {table}_pkey")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT games_user_id_fkey TO {table}_user_id_fkey")
+
+
+def _partition_games() -> None:
+    bind = op.get_bind()
+    op.execute("ALTER TABLE games RENAME TO games_unpartitioned")
+    op.execute("ALTER INDEX ix_games_id RENAME TO ix_games_unpartitioned_id")
+    _rename_constraints("games_unpartitioned")
+    op.execute("""
+        CREATE TABLE games (
+            id INTEGER NOT NULL DEFAULT nextval('games_id_seq'),
+            user_id INTEGER,
+            score INTEGER,
+            mode VARCHAR,
+            duration INTEGER,
+            played_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT games_pkey PRIMARY KEY (id, played_at),
+            CONSTRAINT games_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)
+        ) PARTITION BY RANGE (played_at)
+    """)
+    op.execute("CREATE TABLE games_default PARTITION OF games DEFAULT")
+
+    first = bind.execute(sa.text("SELECT min(played_at) FROM games_unpartitioned")).scalar()
+    for month, upper in _month_starts(first or datetime.now(timezone.utc), MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE games_y{month.year}m{month.month:02d} PARTITION OF games "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+
+    op.execute("""
+        INSERT INTO games (id, user_id, score, mode, duration, played_at)
+        SELECT id, user_id, score, mode, duration, COALESCE(played_at, now()) FROM games_unpartitioned
+    """)
+    # The sequence is owned by the old table and would be dropped with it
+    op.execute("ALTER SEQUENCE games_id_seq OWNED BY games.id")
+    op.execute("DROP TABLE games_unpartitioned")
+    op.create_index(op.f('ix_games_id'), 'games', ['id'], unique=False)
+
+
+def _unpartition_games() -> None:
+    op.execute("ALTER TABLE games RENAME TO games_partitioned")
+    op.execute("ALTER INDEX ix_games_id RENAME TO ix_games_partitioned_id")
+    _rename_constraints("games_partitioned")
+    op.execute("""
+        CREATE TABLE games (
+            id INTEGER NOT NULL DEFAULT nextval('games_id_seq'),
+            user_id INTEGER,
+            score INTEGER,
+            mode VARCHAR,
+            duration INTEGER,
+            played_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT games_pkey PRIMARY KEY (id),
+            CONSTRAINT games_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO games (id, user_id, score, mode, duration, played_at)
+        SELECT id, user_id, score, mode, duration, played_at FROM games_partitioned
+    """)
+    op.execute("ALTER SEQUENCE games_id_seq OWNED BY games.id")
+    op.execute("DROP TABLE games_partitioned")
+    op.create_index(op.f('ix_games_id'), 'games', ['id'], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_games()
+    op.create_index(op.f('ix_games_played_at'), 'games', ['played_at'], unique=False)
+
+    op.create_table('game_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('mode', sa.String(), nullable=False),
+    sa.Column('period_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('games_played', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.BigInteger(), nullable=False),
+    sa.Column('total_duration', sa.BigInteger(), nullable=False),
+    sa.Column('best_score', sa.Integer(), nullable=False),
+    sa.Column('best_played_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'mode', 'period_start', name='uq_game_summaries_user_mode_period')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('game_summaries')
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_games()
+    else:
+        op.drop_index(op.f('ix_games_played_at'), table_name='games')
@@ -0,0 +1,39 @@
+"""Add score_buckets for per-mode score histograms
+
+Revision ID: 85325118b7bf
+Revises: f12d77bec5f9
+Create Date: 2026-10-19 15:12:41.203318
+
+Also indexes games on (user_id, mode, score), so a player's best score per
+mode (the percentile endpoint) is an index lookup instead of a scan. On
+Postgres the index is created on the partitioned table and cascades to every
+partition, existing and future.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '85325118b7bf'
+down_revision: Union[str, Sequence[str], None] = 'f12d77bec5f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('score_buckets',
+    sa.Column('mode', sa.String(), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('mode', 'bucket')
+    )
+    op.create_index('ix_games_user_mode_score', 'games', ['user_id', 'mode', 'score'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_games_user_mode_score', table_name='games')
+    op.drop_table('score_buckets')
@@ -0,0 +1,33 @@
+"""Add lower(username) index for player search
+
+Revision ID: f12d77bec5f9
+Revises: 823d0c94aa7e
+Create Date: 2026-10-19 14:03:27.518840
+
+Player search matches prefixes with LIKE, which a plain index only serves
+under the C collation, so on Postgres the index uses text_pattern_ops.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f12d77bec5f9'
+down_revision: Union[str, Sequence[str], None] = '823d0c94aa7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE INDEX ix_users_username_lower ON users (lower(username) text_pattern_ops)')
+    else:
+        op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_username_lower', table_name='users')
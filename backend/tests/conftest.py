@@ -1,45 +1,44 @@
+import os
 import pytest
-from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import AsyncGenerator
 
-from app.database import Base, get_db
-from app.main import app
+from app import datasets
+from tests.support import DatabaseSnapshot
+# Shared autouse resets and the `client` fixture
+from tests.support.fixtures import client, reset_idempotency_keys, reset_rate_limits, reset_rooms, reset_score_distributions  # noqa: F401
 
-# Use in-memory SQLite for tests
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# In-memory SQLite copies unless a Postgres database is given
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# Size of the shared dataset for scaling tests
+SEEDED_USERS = 1000
+SEEDED_GAMES = 100_000
 
-TestingSessionLocal = async_sessionmaker(
-    autocommit=False, 
-    autoflush=False, 
-    bind=engine, 
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+@pytest.fixture(scope="session")
+def db_snapshot(tmp_path_factory) -> DatabaseSnapshot:
+    """The empty schema, built once; every test gets its own copy."""
+    snapshot = DatabaseSnapshot(tmp_path_factory.mktemp("db"), TEST_DATABASE_URL).build()
+    yield snapshot
+    snapshot.close()
 
-@pytest.fixture
-async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with TestingSessionLocal() as session:
-        yield session
+@pytest.fixture(scope="session")
+def seeded_snapshot(tmp_path_factory) -> DatabaseSnapshot:
+    async def seed(conn):
+        await datasets.populate(conn, SEEDED_USERS, SEEDED_GAMES)
+    snapshot = DatabaseSnapshot(tmp_path_factory.mktemp("db"), TEST_DATABASE_URL, seed=seed, name="seeded").build()
+    yield snapshot
+    snapshot.close()
 
-@pytest.fixture(autouse=True)
-async def setup_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+@pytest.fixture
+async def override_get_db(db_snapshot) -> AsyncGenerator[AsyncSession, None]:
+    async with db_snapshot.copy() as sessionmaker:
+        async with sessionmaker() as session:
+            yield session
 
 @pytest.fixture
-async def client(override_get_db) -> AsyncGenerator[AsyncClient, None]:
-    app.dependency_overrides[get_db] = lambda: override_get_db
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
-        yield ac
-    app.dependency_overrides.clear()
+async def seeded_db(seeded_snapshot) -> AsyncGenerator[AsyncSession, None]:
+    """A private copy of SEEDED_USERS players and SEEDED_GAMES games."""
+    async with seeded_snapshot.copy() as sessionmaker:
+        async with sessionmaker() as session:
+            yield session
@@ -0,0 +1,4 @@
+"""Helpers shared by the unit and integration test suites."""
+from .snapshot import DatabaseSnapshot
+
+__all__ = ["DatabaseSnapshot"]
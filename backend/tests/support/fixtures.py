@@ -0,0 +1,33 @@
+"""Fixtures both test suites' conftests import."""
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncGenerator
+
+from app.database import get_db, get_read_db
+from app.main import app
+from app import histograms, idempotency, ratelimit, rooms
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    ratelimit.store.clear()
+
+@pytest.fixture(autouse=True)
+def reset_idempotency_keys():
+    idempotency.store.clear()
+
+@pytest.fixture(autouse=True)
+def reset_score_distributions():
+    histograms.score_distributions.clear()
+
+@pytest.fixture(autouse=True)
+def reset_rooms():
+    rooms.manager.clear()
+
+@pytest.fixture
+async def client(override_get_db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    app.dependency_overrides[get_db] = lambda: override_get_db
+    app.dependency_overrides[get_read_db] = lambda: override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
@@ -0,0 +1,169 @@
+"""Database snapshots for the test suites.
+
+The schema, plus any seed data, is built once per session into a template.
+Each test then gets its own copy instead of re-running `create_all`/`drop_all`
+and re-seeding:
+
+- SQLite in memory (default): the template stays in a named in-memory
+  database and is cloned into a fresh one with SQLite's backup API, a page
+  copy that replays no SQL.
+- SQLite on disk (`on_disk=True`): the template file is copied, for tests that
+  open several connections at once.
+- Postgres: the template is committed once, in its own schema, and each test
+  runs inside a transaction that is rolled back at the end. The app's own
+  commits become SAVEPOINTs inside it. All sessions share the test's one
+  connection, so tests that run requests in parallel need SQLite.
+
+Copies cost roughly the size of the template, so a session can seed a million
+games once (see `app.datasets`) and hand every test a private copy.
+"""
+import asyncio
+import itertools
+import re
+import shutil
+import sqlite3
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import aiosqlite
+from sqlalchemy import MetaData
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import models  # noqa: F401  registers the tables on Base.metadata
+from app.database import Base, make_engine, make_sessionmaker
+
+Seed = Callable[[AsyncConnection], Awaitable[object]]
+
+_snapshot_ids = itertools.count()
+
+
+class DatabaseSnapshot:
+    def __init__(
+        self,
+        directory: Path,
+        url: Optional[str] = None,
+        seed: Optional[Seed] = None,
+        name: str = "template",
+        metadata: MetaData = Base.metadata,
+    ):
+        """`url` is a Postgres database to use; SQLite files go in `directory` otherwise."""
+        self.directory = Path(directory)
+        self.url = url
+        self.seed = seed
+        self.name = re.sub(r"\W", "_", name)
+        self.metadata = metadata
+        # Shared-cache URI, so copies can open the template with aiosqlite; it lives as long as `_template`
+        self._template_uri = f"file:{self.name}-{next(_snapshot_ids)}?mode=memory&cache=shared"
+        self._template: Optional[sqlite3.Connection] = None
+        self._copies = 0
+
+    @property
+    def postgres(self) -> bool:
+        return self.url is not None and self.url.startswith("postgresql")
+
+    def build(self) -> "DatabaseSnapshot":
+        """Build the template outside an event loop, e.g. in a session-scoped fixture."""
+        asyncio.run(self.create())
+        return self
+
+    async def create(self) -> None:
+        await (self._build_postgres() if self.postgres else self._build_sqlite())
+
+    def close(self) -> None:
+        if self._template is not None:
+            self._template.close()
+            self._template = None
+
+    # SQLite
+
+    def _sqlite_engine(self, connect: Callable[[], Awaitable[aiosqlite.Connection]]):
+        return create_async_engine("sqlite+aiosqlite://", async_creator=connect, poolclass=StaticPool)
+
+    async def _clone(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(":memory:")
+        async with aiosqlite.connect(self._template_uri, uri=True) as template:
+            await template.backup(conn)
+        return conn
+
+    async def _build_sqlite(self) -> None:
+        build = await aiosqlite.connect(":memory:")
+        # Nothing to roll back to while seeding a throwaway database
+        await build.execute("PRAGMA journal_mode = OFF")
+
+        async def connect():
+            return build
+        engine = self._sqlite_engine(connect)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(self.metadata.create_all)
+                if self.seed is not None:
+                    await self.seed(conn)
+            # Copied out before disposing the engine closes `build`
+            self._template = sqlite3.connect(self._template_uri, uri=True, check_same_thread=False)
+            await build.backup(self._template)
+        finally:
+            await engine.dispose()
+
+    def _template_file(self) -> Path:
+        """The template written out once, the first time a copy on disk is asked for."""
+        path = self.directory / f"{self.name}.db"
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            file = sqlite3.connect(path)
+            self._template.backup(file)
+            file.close()
+        return path
+
+    # Postgres
+
+    def _postgres_engine(self):
+        # Each snapshot lives in its own schema, so several can share a database
+        return create_async_engine(self.url, connect_args={"server_settings": {"search_path": self.name}})
+
+    async def _build_postgres(self) -> None:
+        engine = self._postgres_engine()
+        try:
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {self.name} CASCADE")
+                await conn.exec_driver_sql(f"CREATE SCHEMA {self.name}")
+                await conn.run_sync(self.metadata.create_all)
+                if self.seed is not None:
+                    await self.seed(conn)
+        finally:
+            await engine.dispose()
+
+    @asynccontextmanager
+    async def copy(self, on_disk: bool = False) -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+        """A session factory over a private copy of the template, discarded afterwards."""
+        path: Optional[Path] = None
+        if self.postgres:
+            engine = self._postgres_engine()
+        elif on_disk:
+            self._copies += 1
+            path = self.directory / f"{self.name}-{self._copies}.db"
+            shutil.copyfile(self._template_file(), path)
+            engine = make_engine(f"sqlite+aiosqlite:///{path}")
+        else:
+            engine = self._sqlite_engine(self._clone)
+        try:
+            if self.postgres:
+                async with engine.connect() as conn:
+                    transaction = await conn.begin()
+                    try:
+                        yield async_sessionmaker(
+                            bind=conn,
+                            class_=AsyncSession,
+                            expire_on_commit=False,
+                            autoflush=False,
+                            join_transaction_mode="create_savepoint",
+                        )
+                    finally:
+                        await transaction.rollback()
+            else:
+                yield make_sessionmaker(engine)
+        finally:
+            await engine.dispose()
+            if path is not None:
+                path.unlink()
@@ -0,0 +1,109 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app import database
+from app.database import Base, ReadRouter, get_db, make_engine, make_sessionmaker
+from app.main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+async def primary_and_replica(tmp_path):
+    """Two SQLite files standing in for the primary and a replica."""
+    engines = [make_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db") for name in ("primary", "replica")]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield [make_sessionmaker(engine) for engine in engines]
+    for engine in engines:
+        await engine.dispose()
+
+
+def test_read_router_round_robin_and_failover():
+    primary, replica_a, replica_b = object(), object(), object()
+    clock = FakeClock()
+    router = ReadRouter(primary, [replica_a, replica_b], sticky_seconds=5, retry_seconds=30, clock=clock)
+
+    assert [router.pick()[0] for _ in range(4)] == [replica_a, replica_b, replica_a, replica_b]
+
+    router.mark_down(0)
+    assert {router.pick()[0] for _ in range(4)} == {replica_b}
+    router.mark_down(1)
+    assert router.pick() == (primary, None)
+
+    # Failed replicas are retried once their back-off expires
+    clock.now += 31
+    assert {router.pick()[0] for _ in range(4)} == {replica_a, replica_b}
+
+
+def test_read_router_sticks_to_primary_after_write():
+    primary, replica = object(), object()
+    clock = FakeClock()
+    router = ReadRouter(primary, [replica], sticky_seconds=5, clock=clock)
+
+    until = router.mark_write()
+    assert router.pick(until)[0] is primary
+    assert router.pick()[0] is replica
+    # A deadline no write could have set is ignored
+    assert router.pick(clock.now + 3600)[0] is replica
+
+    clock.now += 6
+    assert router.pick(until)[0] is replica
+
+
+@pytest.mark.asyncio
+async def test_check_health_marks_unreachable_replica(primary_and_replica, tmp_path):
+    primary, replica = primary_and_replica
+    broken = make_sessionmaker(make_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"))
+    router = ReadRouter(primary, [replica, broken])
+
+    assert await router.check_health() == {0: True, 1: False}
+    assert router.healthy_replicas() == [0]
+    await broken.kw["bind"].dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_own_write(primary_and_replica, monkeypatch):
+    primary, replica = primary_and_replica
+    monkeypatch.setattr(database, "read_router", ReadRouter(primary, [replica]))
+
+    async def primary_db():
+        async with primary() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = primary_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            r = await client.post("/api/auth/signup", json={
+                "username": "replicated",
+                "email": "replicated@example.com",
+                "password": "pass"
+            })
+            headers = {"Authorization": f"Bearer {r.json()['token']}"}
+            # Signing up is a write too; the cookie carries that to whichever worker reads next
+            assert database.STICKY_COOKIE in r.cookies
+            response = await client.get("/api/stats/global", headers=headers)
+            assert response.json()["totalPlayers"] == 1
+
+            # Nothing is replicated in this setup, so once the cookie is gone the replica never saw the user
+            client.cookies.clear()
+            response = await client.get("/api/stats/global", headers=headers)
+            assert response.json()["totalPlayers"] == 0
+
+            await client.post("/api/leaderboards/scores", json={"score": 50, "mode": "walls", "duration": 10}, headers=headers)
+            response = await client.get("/api/stats/global", headers=headers)
+            assert response.json() == {"totalPlayers": 1, "totalGames": 1, "highestScore": 50}
+
+            # Other clients keep reading from the replica
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as other:
+                response = await other.get("/api/stats/global")
+            assert response.json()["totalPlayers"] == 0
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import func, select
+
+from app import datasets
+from app.histograms import ScoreDistributions
+from app.models import Game, User
+from tests.support import DatabaseSnapshot
+
+@pytest.mark.asyncio
+async def test_seeded_dataset_is_consistent(seeded_db):
+    games = (await seeded_db.execute(select(func.count()).select_from(Game))).scalar()
+    assert games >= 100_000
+    # Players' stats already match their games
+    played, best = (await seeded_db.execute(select(func.sum(User.games_played), func.max(User.high_score)))).one()
+    assert played == games
+    assert best == (await seeded_db.execute(select(func.max(Game.score)))).scalar()
+    distributions = ScoreDistributions()
+    await distributions.rebuild(seeded_db)
+    assert sum(histogram.total for histogram in distributions.merged.values()) == games
+    played_at = (await seeded_db.execute(select(Game.played_at).order_by(Game.id).limit(3))).scalars().all()
+    assert played_at == sorted(played_at)
+
+@pytest.mark.asyncio
+async def test_snapshot_copies_are_isolated(tmp_path):
+    async def seed(conn):
+        await datasets.populate(conn, users=3, games=50)
+
+    snapshot = DatabaseSnapshot(tmp_path, seed=seed)
+    await snapshot.create()
+    try:
+        for on_disk in (False, True, False):
+            async with snapshot.copy(on_disk=on_disk) as sessionmaker:
+                async with sessionmaker() as db:
+                    assert len((await db.execute(select(Game.id))).all()) == 50
+                    db.add(Game(user_id=1, score=10, mode="walls", duration=5))
+                    await db.commit()
+    finally:
+        snapshot.close()
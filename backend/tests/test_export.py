@@ -0,0 +1,31 @@
+import json
+import pytest
+from httpx import AsyncClient
+
+@pytest.mark.asyncio
+async def test_export_games(client: AsyncClient):
+    r = await client.post("/api/auth/signup", json={
+        "username": "exporter",
+        "email": "export@example.com",
+        "password": "pass"
+    })
+    headers = {"Authorization": f"Bearer {r.json()['token']}"}
+    for score in (10, 20, 30):
+        await client.post("/api/leaderboards/scores", json={"score": score, "mode": "walls", "duration": 60}, headers=headers)
+
+    # Exports need a signed-in player
+    response = await client.get("/api/export/games")
+    assert response.status_code == 401
+
+    response = await client.get("/api/export/games?format=ndjson&chunkSize=2", headers=headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["score"] for row in rows] == [10, 20, 30]
+    assert rows[0]["username"] == "exporter"
+
+    # Incremental export past the first game's id
+    response = await client.get(f"/api/export/games?format=csv&afterId={rows[0]['id']}", headers=headers)
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,user_id,username,score,mode,duration,played_at"
+    assert len(lines) == 3
@@ -0,0 +1,57 @@
+import random
+import time
+
+from app.game import FOOD, Board, Snake
+
+def make_board(grid_size, mode, snakes, food=()):
+    board = Board(grid_size, mode, random.Random(0))
+    for snake_id, (body, direction) in snakes.items():
+        board.snakes[snake_id] = Snake(snake_id, body, direction)
+        board.cells.update({cell: snake_id for cell in body})
+    board.cells.update({cell: FOOD for cell in food})
+    return board
+
+def test_board_rules():
+    board = make_board(10, "walls", {"a": ([(2, 0), (1, 0), (0, 0)], "RIGHT")}, food=[(3, 0)])
+    changes, scored, died = board.tick()
+    assert scored == ["a"] and board.snakes["a"].score == 10
+    assert list(board.snakes["a"].body) == [(3, 0), (2, 0), (1, 0), (0, 0)]
+    assert list(board.cells.values()).count(FOOD) == 1  # replaced elsewhere
+
+    board.steer("a", "LEFT")  # reversing is ignored
+    board.steer("a", "UP")
+    changes, scored, died = board.tick()
+    assert died == ["a"] and board.alive == 0
+    assert all(owner != "a" for owner in board.cells.values())
+
+    board = make_board(10, "pass-through", {"a": ([(9, 5), (8, 5), (7, 5)], "RIGHT")})
+    board.tick()
+    assert board.snakes["a"].body[0] == (0, 5)
+
+    # Head-on into the same cell kills both; following a tail is fine
+    board = make_board(10, "walls", {
+        "a": ([(2, 5), (1, 5), (0, 5)], "RIGHT"),
+        "b": ([(4, 5), (5, 5), (6, 5)], "LEFT"),
+        "c": ([(0, 8), (0, 9), (1, 9)], "UP"),
+        "d": ([(1, 7), (1, 8), (2, 8)], "UP"),
+    })
+    board.steer("c", "RIGHT")
+    _, _, died = board.tick()
+    assert sorted(died) == ["a", "b", "c"]  # c turned into d's body
+    assert board.snakes["d"].alive
+
+def test_board_tick_cost_is_independent_of_grid_size():
+    changed = []
+    for grid_size in (20, 5000):
+        board = make_board(grid_size, "walls", {
+            "a": ([(5, 5), (4, 5), (3, 5)], "RIGHT"),
+            "b": ([(5, 8), (4, 8), (3, 8)], "RIGHT"),
+        }, food=[(10, 10)])
+        started = time.perf_counter()
+        for _ in range(5):
+            changes, _, _ = board.tick()
+            changed.append(len(changes))
+        assert time.perf_counter() - started < 0.01
+        assert len(board.cells) == 7  # nothing proportional to the grid is allocated
+    # Every tick touches exactly one head and one tail per snake
+    assert changed == [4] * 10
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from app import health
+from app.database import make_engine
+
+@pytest.mark.asyncio
+async def test_liveness(client: AsyncClient):
+    response = await client.get("/api/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+@pytest.mark.asyncio
+async def test_readiness_probe_is_cached(client: AsyncClient, monkeypatch, tmp_path):
+    probe_engine = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'probe.db'}")
+    checkouts = []
+    event.listen(probe_engine.sync_engine, "checkout", lambda *args: checkouts.append(1))
+    monkeypatch.setattr(health, "readiness", health.ReadinessProbe(probe_engine, cache_seconds=60))
+
+    # A flood of probes costs a single pooled connection checkout
+    responses = await asyncio.gather(*(client.get("/api/health/ready") for _ in range(20)))
+    assert {r.status_code for r in responses} == {200}
+    assert responses[0].json()["database"] == "connected"
+    assert len(checkouts) == 1
+
+    # Readiness waits for in-memory caches to warm up
+    monkeypatch.setattr(health, "warmup", health.Warmup())
+    health.warmup.register("test-index")
+    response = await client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["warmup"] == {"test-index": False}
+    health.warmup.mark_warm("test-index")
+    assert (await client.get("/api/health/ready")).status_code == 200
+    await probe_engine.dispose()
+
+@pytest.mark.asyncio
+async def test_health_reports_unreachable_database(client: AsyncClient, monkeypatch, tmp_path):
+    probe_engine = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'probe.db'}")
+    monkeypatch.setattr(health, "readiness", health.ReadinessProbe(probe_engine))
+    response = await client.get("/api/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unhealthy"
+    assert response.json()["database"] == "disconnected"
+    await probe_engine.dispose()
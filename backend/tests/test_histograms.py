@@ -0,0 +1,83 @@
+import pytest
+from httpx import AsyncClient
+
+from app.histograms import ScoreDistributions, ScoreHistogram, bucket_bounds, bucket_index, score_distributions
+
+def test_score_histogram_buckets():
+    for score in (0, 7, 8, 9, 15, 16, 1000, 123_456, 2**31 - 1):
+        lower, upper = bucket_bounds(bucket_index(score))
+        assert lower <= score < upper
+        assert upper - lower <= max(1, lower / 8)
+    assert bucket_index(2**31 - 1) < 256
+
+    histogram = ScoreHistogram()
+    for score in range(100):
+        histogram.add(score)
+    other = ScoreHistogram()
+    other.add(1000, count=100)
+    histogram.merge(other)
+    assert histogram.total == 200
+    assert histogram.top_percent(1000) == 50.0
+    assert histogram.top_percent(50) == pytest.approx(75, abs=2)
+
+@pytest.mark.asyncio
+async def test_score_distribution_and_percentile(client: AsyncClient, override_get_db):
+    tokens = []
+    for username in ("low", "mid", "high"):
+        r = await client.post("/api/auth/signup", json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": "pass"
+        })
+        tokens.append({"Authorization": f"Bearer {r.json()['token']}"})
+    for headers, score in zip(tokens, (10, 500, 5000)):
+        await client.post("/api/leaderboards/scores", json={"score": score, "mode": "walls", "duration": 60}, headers=headers)
+    await client.post("/api/leaderboards/scores", json={"score": 3, "mode": "pass-through", "duration": 60}, headers=tokens[0])
+
+    response = await client.get("/api/stats/distribution?mode=walls")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert [bucket["min"] <= score <= bucket["max"] for bucket, score in zip(data["buckets"], (10, 500, 5000))] == [True] * 3
+    assert (await client.get("/api/stats/distribution")).json()["total"] == 4
+
+    response = await client.get("/api/stats/percentile/3?mode=walls")
+    assert response.json() == {"mode": "walls", "score": 5000, "topPercent": pytest.approx(33.33, abs=1), "total": 3}
+    response = await client.get("/api/stats/percentile/1?mode=walls")
+    assert response.json()["topPercent"] == 100.0
+
+    # Each worker flushes its own counts and sees everyone's after a sync
+    other_worker = ScoreDistributions()
+    other_worker.record("walls", 20)
+    await other_worker.sync(override_get_db)
+    assert other_worker.histogram(["walls"]).total == 1
+    await score_distributions.sync(override_get_db)
+    assert (await client.get("/api/stats/distribution?mode=walls")).json()["total"] == 4
+    await other_worker.sync(override_get_db)
+    assert other_worker.histogram(["walls"]).total == 4
+
+    # Rebuilding from the games table drops counts with no game behind them
+    rebuilt = ScoreDistributions()
+    await rebuilt.rebuild(override_get_db)
+    assert rebuilt.histogram(["walls"]).total == 3
+    assert rebuilt.histogram(["pass-through"]).total == 1
+
+@pytest.mark.asyncio
+async def test_sync_writes_counts_once_when_the_reload_fails(override_get_db, monkeypatch):
+    db = override_get_db
+    distributions = ScoreDistributions()
+    distributions.record("walls", 100)
+
+    execute = db.execute
+    async def fail_reads(statement, *args, **kwargs):
+        if statement.is_select:
+            raise OSError("connection lost")
+        return await execute(statement, *args, **kwargs)
+    monkeypatch.setattr(db, "execute", fail_reads)
+    with pytest.raises(OSError):
+        await distributions.sync(db)
+    monkeypatch.undo()
+
+    # The committed counts aren't queued again
+    await distributions.sync(db)
+    assert distributions.merged["walls"].total == 1
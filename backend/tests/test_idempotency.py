@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from app import idempotency
+from app.models import Game, IdempotencyKey, User
+
+@pytest.mark.asyncio
+async def test_score_retries_with_idempotency_key_are_replayed(client: AsyncClient, override_get_db):
+    r = await client.post("/api/auth/signup", json={"username": "retrier", "email": "retrier@example.com", "password": "pass"})
+    headers = {"Authorization": f"Bearer {r.json()['token']}", "Idempotency-Key": "game-1"}
+    payload = {"score": 70, "mode": "walls", "duration": 30}
+    first = await client.post("/api/leaderboards/scores", json=payload, headers=headers)
+    assert first.status_code == 200 and "Idempotent-Replayed" not in first.headers
+
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    sync_engine = override_get_db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", count)
+    try:
+        retries = [await client.post("/api/leaderboards/scores", json=payload, headers=headers) for _ in range(3)]
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count)
+    assert statements == []
+    assert all(retry.json() == first.json() for retry in retries)
+    assert retries[0].headers["Idempotent-Replayed"] == "true"
+
+    # Same key, different game
+    response = await client.post("/api/leaderboards/scores", json={**payload, "score": 80}, headers=headers)
+    assert response.status_code == 422
+    # The key belongs to the user, not the whole app
+    r = await client.post("/api/auth/signup", json={"username": "other", "email": "other@example.com", "password": "pass"})
+    response = await client.post("/api/leaderboards/scores", json=payload, headers={**headers, "Authorization": f"Bearer {r.json()['token']}"})
+    assert response.status_code == 200 and response.json()["username"] == "other"
+
+    games = (await override_get_db.execute(select(Game))).scalars().all()
+    assert len(games) == 2
+    user = (await override_get_db.execute(select(User).where(User.username == "retrier"))).scalar_one()
+    await override_get_db.refresh(user)
+    assert user.games_played == 1
+
+def test_idempotency_store_is_bounded_and_expires():
+    now = [0.0]
+    store = idempotency.IdempotencyStore(ttl=10, max_keys=3, persist=False, clock=lambda: now[0])
+    for i in range(5):
+        store.put((1, f"k{i}"), "fp", f"r{i}")
+    assert len(store) == 3
+    assert store.get((1, "k1")) is None and store.get((1, "k4")) == ("fp", "r4")
+
+    now[0] = 10
+    assert store.get((1, "k4")) is None
+    store.put((1, "k5"), "fp", "r5")
+    assert len(store) == 1
+
+@pytest.mark.asyncio
+async def test_persisted_idempotency_keys_survive_other_workers(client: AsyncClient, override_get_db, monkeypatch):
+    monkeypatch.setattr(idempotency.store, "persist", True)
+    r = await client.post("/api/auth/signup", json={"username": "mobile", "email": "mobile@example.com", "password": "pass"})
+    headers = {"Authorization": f"Bearer {r.json()['token']}", "Idempotency-Key": "game-1"}
+    payload = {"score": 50, "mode": "pass-through", "duration": 30}
+    first = await client.post("/api/leaderboards/scores", json=payload, headers=headers)
+
+    # A retry landing on a worker that never saw the key
+    idempotency.store.clear()
+    retry = await client.post("/api/leaderboards/scores", json=payload, headers=headers)
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert len((await override_get_db.execute(select(Game))).scalars().all()) == 1
+
+    # Rows outlive the TTL only until the prune job runs
+    later = datetime.now(timezone.utc) + timedelta(seconds=idempotency.IDEMPOTENCY_TTL_SECONDS + 60)
+    assert await idempotency.prune_expired(override_get_db, now=later) == 1
+    assert (await override_get_db.execute(select(IdempotencyKey))).first() is None
+
+@pytest.mark.asyncio
+async def test_only_key_conflicts_replay_a_stored_response(override_get_db):
+    db = override_get_db
+    db.add(User(username="dup", email="dup@example.com", hashed_password="x"))
+    db.add(IdempotencyKey(user_id=1, key="k", fingerprint="fp", response="{}"))
+    await db.commit()
+
+    db.add(IdempotencyKey(user_id=1, key="k", fingerprint="fp", response="{}"))
+    with pytest.raises(IntegrityError) as key_error:
+        await db.commit()
+    await db.rollback()
+    assert idempotency.is_key_conflict(key_error.value)
+
+    db.add(User(username="dup", email="other@example.com", hashed_password="x"))
+    with pytest.raises(IntegrityError) as other_error:
+        await db.commit()
+    await db.rollback()
+    assert not idempotency.is_key_conflict(other_error.value)
@@ -0,0 +1,39 @@
+import pytest
+from datetime import datetime, timezone
+from httpx import AsyncClient
+
+from app.jobs import prune_active_players, recompute_user_stats
+from app.models import GameSummary
+from app.schemas import ActivePlayer
+from app.routers import spectator
+
+@pytest.mark.asyncio
+async def test_recompute_user_stats(client: AsyncClient, override_get_db):
+    r = await client.post("/api/auth/signup", json={
+        "username": "drifter",
+        "email": "drifter@example.com",
+        "password": "pass"
+    })
+    headers = {"Authorization": f"Bearer {r.json()['token']}"}
+    for score in (40, 90):
+        await client.post("/api/leaderboards/scores", json={"score": score, "mode": "walls", "duration": 60}, headers=headers)
+    override_get_db.add(GameSummary(
+        user_id=1, mode="walls", period_start=datetime(2020, 1, 1), games_played=5,
+        total_score=500, total_duration=300, best_score=300, best_played_at=datetime(2020, 1, 2),
+    ))
+    await override_get_db.commit()
+
+    assert await recompute_user_stats(override_get_db) == 1
+    stats = (await client.get("/api/stats/user/1")).json()
+    assert (stats["highScore"], stats["gamesPlayed"]) == (300, 7)
+    assert await recompute_user_stats(override_get_db) == 0
+
+def test_prune_active_players(monkeypatch):
+    now = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    players = [
+        ActivePlayer(id=str(i), username=f"p{i}", score=0, mode="walls", startedAt=started)
+        for i, started in enumerate([datetime(2026, 1, 1, 9, tzinfo=timezone.utc), datetime(2026, 1, 1, 11, 30)])
+    ]
+    monkeypatch.setattr(spectator, "active_players", players)
+    assert prune_active_players(3600, now=now) == 1
+    assert [player.id for player in spectator.active_players] == ["1"]
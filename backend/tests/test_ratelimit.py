@@ -0,0 +1,55 @@
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from starlette.requests import Request
+
+from app import ratelimit
+from app.routers import auth
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills():
+    now = [0.0]
+    store = ratelimit.MemoryBucketStore(max_keys=2, clock=lambda: now[0])
+    limiter = ratelimit.RateLimiter("test", "2/second", bucket_store=store)
+
+    await limiter.hit("a")
+    await limiter.hit("a")
+    with pytest.raises(HTTPException) as exc:
+        await limiter.hit("a")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "1"
+
+    now[0] += 0.5
+    await limiter.hit("a")
+
+    # Least recently used buckets are evicted past max_keys
+    await limiter.hit("b")
+    await limiter.hit("c")
+    assert len(store._buckets) == 2
+
+@pytest.mark.asyncio
+async def test_login_is_rate_limited(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(auth.login_limit, "burst", 3.0)
+    credentials = {"email": "nobody@example.com", "password": "wrong"}
+    statuses = [(await client.post("/api/auth/login", json=credentials)).status_code for _ in range(4)]
+    assert statuses == [401, 401, 401, 429]
+
+    response = await client.post("/api/auth/login", json=credentials)
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def _request(forwarded_for: str, peer: str = "127.0.0.1") -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())]
+    return Request({"type": "http", "headers": headers, "client": (peer, 50000)})
+
+
+@pytest.mark.parametrize(
+    "trusted, expected",
+    [(0, "127.0.0.1"), (1, "10.0.0.7"), (2, "203.0.113.9"), (5, "198.51.100.1")],
+)
+def test_client_ip_skips_trusted_proxy_hops(monkeypatch, trusted, expected):
+    # A spoofed entry from the client, then the client as seen by Render's
+    # proxy, then Render's proxy as seen by nginx; nginx is the peer
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUSTED_PROXIES", trusted)
+    request = _request("198.51.100.1, 203.0.113.9, 10.0.0.7")
+    assert ratelimit.client_ip(request) == expected
@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime, timezone
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models import Game, GameSummary
+from app.retention import rollup_and_prune
+
+@pytest.mark.asyncio
+async def test_rollup_keeps_each_months_best_game(client: AsyncClient, override_get_db):
+    r = await client.post("/api/auth/signup", json={
+        "username": "veteran",
+        "email": "veteran@example.com",
+        "password": "pass"
+    })
+    user_id = int(r.json()["user"]["id"])
+    db = override_get_db
+    db.add_all([
+        Game(user_id=user_id, score=900, mode="walls", duration=60, played_at=datetime(2024, 1, 5)),
+        Game(user_id=user_id, score=300, mode="walls", duration=40, played_at=datetime(2024, 1, 20)),
+        Game(user_id=user_id, score=100, mode="walls", duration=20, played_at=datetime(2026, 3, 1)),
+    ])
+    await db.commit()
+
+    report = await rollup_and_prune(db, retention_months=6, now=datetime(2026, 4, 15, tzinfo=timezone.utc))
+    assert report["deleted_games"] == 2
+    assert report["summarized_periods"] == 1
+
+    summary = (await db.execute(select(GameSummary))).scalars().one()
+    assert (summary.games_played, summary.total_score, summary.best_score) == (2, 1200, 900)
+
+    # The rolled-up best game still tops the leaderboard and counts for ranks
+    response = await client.get("/api/leaderboards?mode=walls")
+    assert [e["score"] for e in response.json()] == [900, 100]
+    response = await client.get(f"/api/leaderboards/rank/{user_id}")
+    assert response.json() == {"rank": 1}
+
+@pytest.mark.asyncio
+async def test_rollup_drops_a_months_other_games_from_leaderboards(client: AsyncClient, override_get_db):
+    user_ids = []
+    for name in ("a", "b"):
+        r = await client.post("/api/auth/signup", json={"username": name, "email": f"{name}@example.com", "password": "pass"})
+        user_ids.append(int(r.json()["user"]["id"]))
+    a, b = user_ids
+    db = override_get_db
+    db.add_all([
+        Game(user_id=a, score=900, mode="walls", duration=60, played_at=datetime(2024, 1, 5)),
+        Game(user_id=a, score=850, mode="walls", duration=60, played_at=datetime(2024, 1, 6)),
+        Game(user_id=b, score=800, mode="walls", duration=60, played_at=datetime(2024, 1, 7)),
+    ])
+    await db.commit()
+    response = await client.get("/api/leaderboards?mode=walls")
+    assert [(e["username"], e["score"]) for e in response.json()] == [("a", 900), ("a", 850), ("b", 800)]
+    assert (await client.get(f"/api/leaderboards/rank/{b}")).json() == {"rank": 3}
+
+    await rollup_and_prune(db, retention_months=6, now=datetime(2026, 4, 15, tzinfo=timezone.utc))
+
+    # Only a's best game of January 2024 is left to count
+    response = await client.get("/api/leaderboards?mode=walls")
+    assert [(e["username"], e["score"]) for e in response.json()] == [("a", 900), ("b", 800)]
+    assert (await client.get(f"/api/leaderboards/rank/{b}")).json() == {"rank": 2}
+    # The summary still counts every game
+    summary = (await db.execute(select(GameSummary).where(GameSummary.user_id == a))).scalars().one()
+    assert (summary.games_played, summary.best_score) == (2, 900)
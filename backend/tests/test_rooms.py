@@ -0,0 +1,98 @@
+import json
+import pytest
+import random
+from fastapi.testclient import TestClient
+from httpx import AsyncClient
+
+from app import rooms
+from app.main import app
+from app.rooms import Room, RoomFull, manager as room_manager
+from app.routers import spectator
+
+@pytest.mark.asyncio
+async def test_room_broadcasts_deltas(client: AsyncClient):
+    r = await client.post("/api/auth/signup", json={
+        "username": "host",
+        "email": "host@example.com",
+        "password": "pass"
+    })
+    headers = {"Authorization": f"Bearer {r.json()['token']}"}
+    response = await client.post("/api/rooms", json={"mode": "pass-through", "gridSize": 30}, headers=headers)
+    assert response.status_code == 201
+    room_id = response.json()["id"]
+    response = await client.post(f"/api/rooms/{room_id}/join", headers=headers)
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert (await client.post(f"/api/rooms/{room_id}/join", headers=headers)).json()["ticket"] == ticket
+    assert (await client.post("/api/rooms/nope/join", headers=headers)).status_code == 404
+
+    room = room_manager.get(room_id)
+    player_id = room.player_for(ticket)
+    assert room.spawn(player_id)
+    player, spectator = room.subscribe(player_id), room.subscribe()
+    assert json.loads(player.queue.get_nowait())["type"] == "snapshot"
+    assert json.loads(spectator.queue.get_nowait())["snakes"][player_id]["alive"]
+
+    room.steer(player_id, "DOWN")
+    room_manager.tick_all()
+    delta = json.loads(spectator.queue.get_nowait())
+    assert delta["type"] == "tick" and delta["tick"] == 1
+    assert player.queue.get_nowait() == json.dumps(delta, separators=(",", ":"))
+    head = room.board.snakes[player_id].body[0]
+    assert [head[0], head[1], player_id] in delta["cells"]
+
+    # A connection that stops reading gets a snapshot instead of an endless backlog
+    for _ in range(40):
+        room_manager.tick_all()
+    assert spectator.resyncs >= 1
+    assert spectator.queue.qsize() < 32
+    assert (await client.get(f"/api/rooms/{room_id}")).json()["spectators"] == 1
+
+    room.unsubscribe(player)
+    room.unsubscribe(spectator)
+    assert room.board.alive == 0 and room_manager.close_idle(max_idle=0) == 1
+    assert (await client.get("/api/rooms")).json() == []
+
+def test_room_websocket():
+    room = room_manager.create("walls", 20)
+    ticket = room.join("1", "player")
+    web = TestClient(app)
+    with web.websocket_connect(f"/api/rooms/{room.id}/ws?ticket={ticket}") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot" and snapshot["snakes"]["1"]["alive"]
+        ws.send_json({"type": "input", "direction": "UP"})
+        ticks = [ws.receive_json() for _ in range(2)]
+        assert [t["type"] for t in ticks] == ["tick", "tick"]
+        assert room.board.snakes["1"].direction == "UP"
+    with pytest.raises(Exception):
+        with web.websocket_connect(f"/api/rooms/{room.id}/ws?ticket=forged") as ws:
+            ws.receive_json()
+
+def test_room_state_round_trip():
+    room = Room("r1", "pass-through", 25, random.Random(1))
+    ticket = room.join("7", "seven")
+    room.spawn("7")
+    room.steer("7", "UP")
+    room.tick()
+    copy = Room.from_state(json.loads(json.dumps(room.export_state())))
+    assert copy.snapshot_message() == room.snapshot_message()
+    assert copy.player_for(ticket) == "7"
+    assert copy.board.cells == room.board.cells
+
+def test_room_seats_free_up_when_players_leave(monkeypatch):
+    monkeypatch.setattr(rooms, "ROOM_MAX_PLAYERS", 2)
+    room = Room("r1", "walls", 20, random.Random(1))
+    connections = []
+    for player in ("1", "2"):
+        ticket = room.join(player, f"p{player}")
+        connections.append(room.subscribe(room.player_for(ticket)))
+    with pytest.raises(RoomFull):
+        room.join("3", "p3")
+
+    room.unsubscribe(connections[0])
+    assert "1" not in room.players and room.player_for(ticket) == "2"
+    ticket = room.join("3", "p3")
+    assert room.player_for(ticket) == "3"
+    # The seat is gone along with the old ticket
+    with pytest.raises(RoomFull):
+        room.join("1", "p1")
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+
+from app.scheduler import LeaderLock, Scheduler
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_jobs(tmp_path):
+    calls = {"slow": 0, "flaky": 0}
+
+    async def slow():
+        calls["slow"] += 1
+        await asyncio.sleep(0.05)
+
+    async def flaky():
+        calls["flaky"] += 1
+        if calls["flaky"] < 3:
+            raise RuntimeError("not yet")
+
+    scheduler = Scheduler(LeaderLock(str(tmp_path / "leader.lock")))
+    slow_job = scheduler.every("slow", 0.01, slow, jitter=0)
+    flaky_job = scheduler.once("flaky", flaky, retry_seconds=0.01)
+    scheduler.start()
+    await asyncio.sleep(0.2)
+    await scheduler.stop()
+
+    # Runs never overlap; due runs are skipped while one is still going
+    assert 2 <= calls["slow"] <= 5 and slow_job.skipped > 0
+    assert slow_job.last_duration >= 0.05
+    assert calls["flaky"] == 3 and flaky_job.done
+    assert flaky_job.failures == 2 and flaky_job.last_error is None
+    assert scheduler.status()["jobs"][0]["lastDurationSeconds"] >= 0.05
+
+@pytest.mark.asyncio
+async def test_job_status_leaves_errors_to_the_log(tmp_path):
+    async def broken():
+        raise ConnectionError("could not connect to postgresql://app:secret@db/snakedb")
+
+    scheduler = Scheduler(LeaderLock(str(tmp_path / "leader.lock")))
+    scheduler.once("broken", broken)
+    scheduler.start()
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    status = scheduler.status()["jobs"][0]
+    assert status["failures"] == 1 and status["lastRunFailed"]
+    assert "secret" not in repr(status)
+
+@pytest.mark.asyncio
+async def test_leader_jobs_run_in_one_worker(tmp_path):
+    runs = []
+    workers = [Scheduler(LeaderLock(str(tmp_path / "leader.lock"))) for _ in range(2)]
+    for i, worker in enumerate(workers):
+        async def job(i=i):
+            runs.append(i)
+        worker.every("leader_job", 0.01, job, leader=True)
+        worker.start()
+    await asyncio.sleep(0.1)
+    assert len(set(runs)) == 1
+    leader = runs[0]
+
+    # The other worker takes over once the leader stops
+    await workers[leader].stop()
+    runs.clear()
+    await asyncio.sleep(0.1)
+    await workers[1 - leader].stop()
+    assert runs and set(runs) == {1 - leader}
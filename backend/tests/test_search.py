@@ -0,0 +1,50 @@
+import pytest
+import time
+from httpx import AsyncClient
+
+from app.search import UsernameIndex, search_players
+
+def test_username_index():
+    index = UsernameIndex()
+    for user_id, username in enumerate(["Alice", "alfred", "Bob", "ALBERT", "carol"], start=1):
+        index.add(user_id, username)
+
+    assert index.search("al", limit=10) == ([(4, "ALBERT"), (2, "alfred"), (1, "Alice")], 3)
+    assert index.search("AL", limit=1, offset=1) == ([(2, "alfred")], 3)
+    assert index.search("z", limit=10) == ([], 0)
+
+    index.add(2, "Zed")
+    index.remove(4)
+    assert index.search("al", limit=10) == ([(1, "Alice")], 1)
+    assert index.search("z", limit=10) == ([(2, "Zed")], 1)
+
+    # Lookups stay well under a millisecond on a large index
+    for user_id in range(10, 100_010):
+        index.add(user_id, f"player{user_id}")
+    started = time.perf_counter()
+    for i in range(1000):
+        index.search(f"player{i}", limit=20)
+    assert (time.perf_counter() - started) / 1000 < 0.001
+
+@pytest.mark.asyncio
+async def test_player_search(client: AsyncClient, override_get_db):
+    for username in ("Alice", "alfred", "bob"):
+        await client.post("/api/auth/signup", json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": "pass"
+        })
+
+    # Without a loaded index this is answered from the lower(username) index
+    response = await client.get("/api/players/search?q=AL&limit=1&offset=1")
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"userId": "1", "username": "Alice"}], "total": 2}
+
+    index = UsernameIndex()
+    await index.load(override_get_db)
+    assert await search_players(override_get_db, "al", 10, index=index) == \
+        await search_players(override_get_db, "al", 10, index=UsernameIndex())
+
+    # LIKE wildcards in the query are matched literally
+    await client.post("/api/auth/signup", json={"username": "b_b", "email": "b_b@example.com", "password": "pass"})
+    assert await search_players(override_get_db, "b_", 10, index=UsernameIndex()) == ([(4, "b_b")], 1)
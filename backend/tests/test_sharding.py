@@ -0,0 +1,29 @@
+import os
+
+from app.rooms import RoomManager
+from app.sharding import SOCKET_DIR_ENV, HashRing, RoomPlacement
+
+def test_hash_ring_moves_only_what_the_new_worker_takes():
+    keys = [f"room-{i}" for i in range(3000)]
+    ring = HashRing(["0", "1", "2"])
+    before = {key: ring.owner(key) for key in keys}
+    assert all(600 < list(before.values()).count(worker) < 1400 for worker in "012")
+
+    ring.add("3")
+    moved = {key for key in keys if ring.owner(key) != before[key]}
+    assert all(ring.owner(key) == "3" for key in moved)
+    assert 450 < len(moved) < 1050  # about a quarter
+
+    ring.remove("3")
+    assert {key: ring.owner(key) for key in keys} == before
+
+
+async def test_stop_tolerates_a_removed_socket(tmp_path, monkeypatch):
+    monkeypatch.setenv(SOCKET_DIR_ENV, str(tmp_path))
+    placement = RoomPlacement(RoomManager())
+    await placement.start()
+    assert placement.sharded
+
+    os.unlink(placement.socket_path(placement.worker_id))
+    await placement.stop()
+    assert not placement.sharded
@@ -1,61 +1,41 @@
 import pytest
-import os
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from typing import AsyncGenerator
 
-from app.database import Base, get_db
+from app.database import get_db, get_read_db
 from app.main import app
-
-# Use a real file for integration tests to test persistence more realistically
-TEST_DB_FILE = "./test_integration.db"
-SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DB_FILE}"
-
-@pytest.fixture(scope="session", autouse=True)
-def setup_test_db():
-    # Remove existing test DB if any
-    if os.path.exists(TEST_DB_FILE):
-        os.remove(TEST_DB_FILE)
-    yield
-    # Cleanup after tests
-    if os.path.exists(TEST_DB_FILE):
-        os.remove(TEST_DB_FILE)
-
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
-
-TestingSessionLocal = async_sessionmaker(
-    autocommit=False, 
-    autoflush=False, 
-    bind=engine, 
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+from tests.support import DatabaseSnapshot
+# Shared autouse resets and the `client` fixture
+from tests.support.fixtures import client, reset_idempotency_keys, reset_rate_limits, reset_rooms, reset_score_distributions  # noqa: F401
+
+@pytest.fixture(scope="session")
+def db_snapshot(tmp_path_factory) -> DatabaseSnapshot:
+    """The empty schema, built once and copied to a file for every test."""
+    snapshot = DatabaseSnapshot(tmp_path_factory.mktemp("db")).build()
+    yield snapshot
+    snapshot.close()
+
+# A real file per test, so parallel requests get connections of their own
+@pytest.fixture
+async def test_sessionmaker(db_snapshot) -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    async with db_snapshot.copy(on_disk=True) as sessionmaker:
+        yield sessionmaker
 
 @pytest.fixture
-async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with TestingSessionLocal() as session:
+async def override_get_db(test_sessionmaker) -> AsyncGenerator[AsyncSession, None]:
+    async with test_sessionmaker() as session:
         yield session
 
-@pytest.fixture(autouse=True)
-async def init_db():
-    # Create tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
-    # We might want to keep data between tests in integration, or drop. 
-    # Usually integration tests might depend on previous state or want clean slate.
-    # Let's drop to ensure isolation per test function, similar to unit tests, 
-    # unless we want a full scenario flow. 
-    # Let's drop to be safe and consistent.
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-
 @pytest.fixture
-async def client(override_get_db) -> AsyncGenerator[AsyncClient, None]:
-    app.dependency_overrides[get_db] = lambda: override_get_db
+async def concurrent_client(test_sessionmaker) -> AsyncGenerator[AsyncClient, None]:
+    """Client whose requests each get their own session, for firing requests in parallel."""
+    async def per_request_db() -> AsyncGenerator[AsyncSession, None]:
+        async with test_sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = per_request_db
+    app.dependency_overrides[get_read_db] = per_request_db
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
     app.dependency_overrides.clear()
@@ -1,5 +1,25 @@
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
 import pytest
 from httpx import AsyncClient
+from websockets.sync.client import connect as ws_connect
+
+from app.database import Base, make_engine
+from app.launcher import wait_ready
+from app.routers import auth
+from app.sharding import HashRing
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
 
 @pytest.mark.asyncio
 async def test_full_game_lifecycle(client: AsyncClient):
@@ -78,3 +98,136 @@ async def test_full_game_lifecycle(client: AsyncClient):
     stats = response.json()
     assert stats["highScore"] == 1500
     assert stats["gamesPlayed"] == 1
+
+@pytest.mark.asyncio
+async def test_parallel_duplicate_signups(concurrent_client: AsyncClient, monkeypatch):
+    """Racing signups for the same email/username: exactly one wins, the rest get 409."""
+    monkeypatch.setattr(auth.signup_limit, "burst", 100.0)
+    payloads = [
+        {"username": "racer", "email": "racer@test.com", "password": "pw"} for _ in range(4)
+    ] + [
+        {"username": f"racer{i}", "email": "racer@test.com", "password": "pw"} for i in range(3)
+    ] + [
+        {"username": "racer", "email": f"racer{i}@test.com", "password": "pw"} for i in range(3)
+    ]
+    responses = await asyncio.gather(*(
+        concurrent_client.post("/api/auth/signup", json=payload) for payload in payloads
+    ))
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [201] + [409] * (len(payloads) - 1)
+    details = {r.json()["detail"] for r in responses if r.status_code == 409}
+    assert details <= {"Email already exists", "Username already taken"}
+
+    # The loser of a profile update race gets a 409 as well
+    winner = next(r.json() for r in responses if r.status_code == 201)
+    other = await concurrent_client.post("/api/auth/signup", json={"username": "other", "email": "other@test.com", "password": "pw"})
+    headers = {"Authorization": f"Bearer {other.json()['token']}"}
+    response = await concurrent_client.patch("/api/auth/me", json={"username": winner["user"]["username"], "email": "other@test.com"}, headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Username already taken"
+
+
+def receive_until(ws, message_type: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        message = json.loads(ws.recv(timeout=max(deadline - time.monotonic(), 0.01)))
+        if message["type"] == message_type:
+            return message
+
+def test_rooms_shard_across_workers(tmp_path):
+    """Rooms live on their ring owner, are reachable from any worker, and move when a worker joins."""
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'rooms.db'}"
+
+    async def create_schema():
+        engine = make_engine(database_url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+    asyncio.run(create_schema())
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "ROOM_SOCKET_DIR": str(tmp_path),
+        "SCHEDULER_LOCK_PATH": str(tmp_path / "scheduler.lock"),
+        "ROOM_RING_REFRESH_SECONDS": "0.2",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.launcher", "serve", "--port", str(port), "--workers", "2", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    try:
+        assert wait_ready(f"{base_url}/api/health/ready", timeout=30)
+        # Until both workers have bound their room sockets the ring is still filling in
+        deadline = time.monotonic() + 10
+        while len(list(tmp_path.glob("worker-*.sock"))) < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        http = httpx.Client(base_url=base_url)
+        token = http.post("/api/auth/signup", json={
+            "username": "partyhost", "email": "party@example.com", "password": "pass"
+        }).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        two_workers = HashRing(["0", "1"])
+        created = {}
+        for _ in range(30):
+            room = http.post("/api/rooms", json={"mode": "pass-through"}, headers=headers).json()
+            assert room["worker"] == two_workers.owner(room["id"])
+            created[room["id"]] = room["worker"]
+        assert set(created.values()) == {"0", "1"}
+        # Whichever worker answers, it lists every worker's rooms
+        for _ in range(4):
+            assert {room["id"] for room in http.get("/api/rooms").json()} == set(created)
+
+        three_workers = HashRing(["0", "1", "2"])
+        moving = [room_id for room_id in created if three_workers.owner(room_id) == "2"]
+        watched = moving[0]
+        ticket = http.post(f"/api/rooms/{watched}/join", headers=headers).json()["ticket"]
+
+        with contextlib.ExitStack() as connections:
+            player = connections.enter_context(ws_connect(f"ws://127.0.0.1:{port}/api/rooms/{watched}/ws?ticket={ticket}"))
+            snapshot = receive_until(player, "snapshot")
+            assert snapshot["roomId"] == watched and snapshot["snakes"]
+            player_id = next(iter(snapshot["snakes"]))
+            # Each connection lands on whichever worker the kernel picks
+            spectators = [
+                connections.enter_context(ws_connect(f"ws://127.0.0.1:{port}/api/rooms/{watched}/ws")) for _ in range(3)
+            ]
+            for spectator in spectators:
+                assert receive_until(spectator, "snapshot")["roomId"] == watched
+                receive_until(spectator, "tick")
+            before_move = receive_until(player, "tick")["tick"]
+
+            proc.send_signal(signal.SIGTTIN)
+            deadline = time.monotonic() + 15
+            while http.get(f"/api/rooms/{watched}").json().get("worker") != "2":
+                assert time.monotonic() < deadline, "room never moved to the new worker"
+                time.sleep(0.2)
+
+            # The connection survives the move: a fresh snapshot from the new owner, then ticks
+            snapshot = receive_until(player, "snapshot")
+            assert snapshot["tick"] >= before_move and snapshot["snakes"][player_id]["alive"]
+            player.send(json.dumps({"type": "input", "direction": "DOWN"}))
+            assert receive_until(player, "tick")["tick"] > snapshot["tick"]
+            for spectator in spectators:
+                receive_until(spectator, "snapshot")
+
+        # Only rooms the new ring gives to worker 2 moved; the rest stayed put
+        deadline = time.monotonic() + 15
+        while True:
+            placed = {room["id"]: room["worker"] for room in http.get("/api/rooms").json()}
+            if placed == {room_id: three_workers.owner(room_id) for room_id in created}:
+                break
+            assert time.monotonic() < deadline, placed
+            time.sleep(0.2)
+        assert all(placed[room_id] == created[room_id] for room_id in created if room_id not in moving)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        output = proc.communicate(timeout=20)[0].decode()
+    assert proc.returncode == 0, output
+    assert "Added worker 2" in output
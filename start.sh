@@ -13,12 +13,21 @@ fi
 echo "Running database migrations..."
 uv run alembic upgrade head
 
-# Start FastAPI backend in background
-echo "Starting FastAPI backend on port 8000..."
-uv run uvicorn app.main:app --host 127.0.0.1 --port 8000 &
+# Create upcoming games partitions and roll up games past GAMES_RETENTION_MONTHS.
+# The scheduler retries daily, so a failure here shouldn't keep the app down
+echo "Running games retention maintenance..."
+uv run python -m app.retention || echo "Games retention maintenance failed; the scheduler will retry it" >&2
 
-# Wait a moment for backend to start
-sleep 2
+# Start FastAPI backend in background: the app is imported once, then
+# WEB_CONCURRENCY workers are forked from it
+WEB_CONCURRENCY="${WEB_CONCURRENCY:-2}"
+# nginx below is one proxy hop; platforms with their own proxy in front add theirs
+export RATE_LIMIT_TRUSTED_PROXIES="${RATE_LIMIT_TRUSTED_PROXIES:-1}"
+echo "Starting FastAPI backend on port 8000 with $WEB_CONCURRENCY workers..."
+uv run python -m app.launcher serve --host 127.0.0.1 --port 8000 --workers "$WEB_CONCURRENCY" &
+
+# Wait until the backend reports ready (database reachable, caches warm)
+uv run python -m app.launcher wait-ready http://127.0.0.1:8000/api/health/ready --timeout 60
 
 # Start Nginx in foreground
 echo "Starting Nginx on port 80..."